@@ -0,0 +1,447 @@
+"""Measure the integration's own overhead against the local stub server.
+
+pip install pytest-homeassistant-custom-component mcp
+python benchmarks/bench.py --requests 200 --concurrency 8
+python benchmarks/bench.py --only micro --memory
+python benchmarks/bench.py --only baseline  # aiohttp only, no Home Assistant needed
+"""
+import argparse
+import asyncio
+import io
+import json
+import math
+import pathlib
+import sys
+import time
+import tracemalloc
+import wave
+from contextlib import contextmanager
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+from stub_server import StubServer  # noqa: E402
+
+
+def percentile(values, pct):
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, math.ceil(pct / 100 * len(values)) - 1))]
+
+
+class BenchResult:
+    def __init__(self, name, latencies, elapsed, peak=None):
+        self.name = name
+        self.latencies = latencies
+        self.elapsed = elapsed
+        self.peak = peak
+
+    def as_dict(self):
+        count = len(self.latencies)
+        return {
+            "name": self.name,
+            "count": count,
+            "ops_per_sec": round(count / self.elapsed, 1) if self.elapsed else 0,
+            "p50_ms": round(percentile(self.latencies, 50), 3),
+            "p95_ms": round(percentile(self.latencies, 95), 3),
+            "p99_ms": round(percentile(self.latencies, 99), 3),
+            "peak_kib": round(self.peak / 1024, 1) if self.peak is not None else None,
+        }
+
+
+@contextmanager
+def track_memory(enabled):
+    box = {}
+    if enabled:
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+    try:
+        yield box
+    finally:
+        if enabled:
+            box["peak"] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+
+async def measure(name, func, requests, concurrency=1, memory=False):
+    """Run `func(i)` `requests` times with bounded concurrency."""
+    latencies = []
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with sem:
+            start = time.perf_counter()
+            await func(i)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    with track_memory(memory) as mem:
+        start = time.perf_counter()
+        await asyncio.gather(*[one(i) for i in range(requests)])
+        elapsed = time.perf_counter() - start
+    return BenchResult(name, latencies, elapsed, mem.get("peak"))
+
+
+def wav_sentence(seconds=0.5, rate=24000):
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(b"\x01\x00" * int(rate * seconds))
+    return buf.getvalue()
+
+
+async def async_iter(items):
+    for item in items:
+        yield item
+
+
+async def run_micro(args):
+    from custom_components.ai_conversation.tts import TextToSpeechEntity
+    from custom_components.ai_conversation.schemas import ChatCompletionsResult
+    from custom_components.ai_conversation.codec import WireCodec
+
+    results = []
+    tokens = [f"token{i}{'. ' if i % 12 == 11 else ' '}" for i in range(400)]
+
+    async def split(_):
+        async for _sentence in TextToSpeechEntity.spilt_sentences(None, async_iter(tokens)):
+            pass
+    results.append(await measure("micro.spilt_sentences", split, args.iterations, memory=args.memory))
+
+    sentences = [wav_sentence() for _ in range(10)]
+
+    async def fix_header(_):
+        header_sent = False
+        for sentence in sentences:
+            async for _chunk in TextToSpeechEntity.fix_wav_header(None, async_iter([sentence]), header_sent):
+                header_sent = True
+    results.append(await measure("micro.fix_wav_header", fix_header, args.iterations, memory=args.memory))
+
+    import numpy
+    from custom_components.ai_conversation import audio
+    from custom_components.ai_conversation.audio import PcmConverter
+    # the tts entity loads it with async_import_numpy before converting
+    audio.np = numpy
+    pcm = [wave.open(io.BytesIO(s)).readframes(-1) for s in sentences]
+
+    async def pcm_convert(_):
+        converter = PcmConverter(24000, 16000, gain=3)
+        for frames in pcm:
+            converter.convert(frames)
+    results.append(await measure("micro.pcm_convert", pcm_convert, args.iterations, memory=args.memory))
+
+    payload = {
+        "choices": [{"index": 0, "message": {
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [
+                {
+                    "id": f"call_{i}",
+                    "type": "function",
+                    "function": {"name": f"tool_{i}", "arguments": json.dumps({"arg": "x" * 200})},
+                }
+                for i in range(50)
+            ],
+        }}],
+        "usage": {"prompt_tokens": 1000, "completion_tokens": 500},
+    }
+    raw = json.dumps(payload)
+
+    async def parse(_):
+        result = ChatCompletionsResult(json.loads(raw))
+        for _ in range(10):
+            message = result.message
+            _ = message.tool_calls, message.content, result.usage
+    results.append(await measure("micro.parse_tool_calls", parse, args.iterations, memory=args.memory))
+
+    tools = [
+        {"type": "function", "function": {
+            "name": f"tool_{i}",
+            "description": f"Control device {i} " * 10,
+            "parameters": {"type": "object", "properties": {
+                "name": {"type": "string", "description": "Name of the entity"},
+                "area": {"type": "string", "description": "Name of the area"},
+                "brightness": {"type": "integer", "minimum": 0, "maximum": 100},
+            }},
+        }}
+        for i in range(120)
+    ]
+    system = {"role": "system", "content": "You are a voice assistant for Home Assistant. " * 100}
+    history = [{"role": "user", "content": "turn on the kitchen light"}]
+
+    async def encode_json(_):
+        json.dumps({"model": "stub", "messages": [system, *history], "tools": tools}).encode()
+    results.append(await measure("micro.encode_json", encode_json, args.iterations, memory=args.memory))
+
+    async def encode_cold(_):
+        codec = WireCodec()
+        cached = [codec.intern(tool) for tool in tools]
+        codec.dumps({"model": "stub", "messages": [system, *history], "tools": cached})
+    results.append(await measure("micro.encode_codec_cold", encode_cold, args.iterations, memory=args.memory))
+
+    codec = WireCodec()
+
+    cached = [codec.intern(tool) for tool in tools]
+
+    async def encode_warm(_):
+        # later tool iterations of a turn reuse the interned tools
+        codec.dumps({"model": "stub", "messages": [system, *history], "tools": cached})
+    results.append(await measure("micro.encode_codec_warm", encode_warm, args.iterations, memory=args.memory))
+    return results
+
+
+def bench_subentries(model):
+    from homeassistant.config_entries import ConfigSubentryData
+    from homeassistant.helpers import llm
+    from types import MappingProxyType
+    return [
+        ConfigSubentryData(
+            data=MappingProxyType({"model": model, "llm_hass_api": [llm.LLM_API_ASSIST]}),
+            subentry_type="conversation", title="Agent", unique_id=None,
+        ),
+        ConfigSubentryData(data=MappingProxyType({"model": "tts-stub"}), subentry_type="tts", title="TTS", unique_id=None),
+        ConfigSubentryData(data=MappingProxyType({"model": "stt-stub"}), subentry_type="stt", title="STT", unique_id=None),
+    ]
+
+
+async def async_echo_api_instance(hass):
+    import voluptuous as vol
+    from homeassistant.helpers import llm
+
+    class EchoTool(llm.Tool):
+        name = "echo"
+        description = "Echo the text back"
+        parameters = vol.Schema({vol.Required("text"): str})
+
+        async def async_call(self, hass, tool_input, llm_context):
+            return {"text": tool_input.tool_args["text"]}
+
+    class BenchAPI(llm.API):
+        async def async_get_api_instance(self, llm_context):
+            return llm.APIInstance(api=self, api_prompt="", llm_context=llm_context, tools=[EchoTool()])
+
+    llm_context = llm.LLMContext(
+        platform="ai_conversation", context=None, language="en", assistant=None, device_id=None,
+    )
+    return await BenchAPI(hass=hass, id="bench", name="Bench").async_get_api_instance(llm_context)
+
+
+async def run_baseline(args, base_url):
+    """The same requests with a bare aiohttp client, the floor the integration overhead is measured against."""
+    import aiohttp
+
+    results = []
+    headers = {"Authorization": "Bearer stub"}
+    audio = wav_sentence(seconds=3, rate=16000)
+    async with aiohttp.ClientSession(base_url.rstrip("/") + "/", headers=headers) as session:
+        async def chat(i):
+            body = {"model": "stub-model-0", "messages": [{"role": "user", "content": f"hello {i}"}]}
+            async with session.post("chat/completions", json=body) as res:
+                await res.read()
+        results.append(await measure("baseline.chat", chat, args.requests, args.concurrency, args.memory))
+
+        async def speech(_):
+            async with session.post("audio/speech", json={"model": "tts-stub", "input": "hello"}) as res:
+                async for _chunk in res.content.iter_any():
+                    pass
+        results.append(await measure("baseline.speech", speech, args.requests, args.concurrency, args.memory))
+
+        async def transcribe(_):
+            form = aiohttp.FormData({"model": "stt-stub"})
+            form.add_field("file", audio, content_type="audio/wav", filename="audio.wav")
+            async with session.post("audio/transcriptions", data=form) as res:
+                await res.read()
+        results.append(await measure("baseline.transcribe", transcribe, args.requests, args.concurrency, args.memory))
+    return results
+
+
+async def run_e2e(args, base_url):
+    from pytest_homeassistant_custom_component.common import MockConfigEntry, async_test_home_assistant
+    from homeassistant.components import conversation
+    from homeassistant.components.conversation.chat_log import ChatLog
+    from homeassistant.components.tts import TTSAudioRequest
+    from homeassistant.components.stt import (
+        SpeechMetadata, AudioFormats, AudioCodecs, AudioBitRates, AudioSampleRates, AudioChannels,
+    )
+    from custom_components.ai_conversation import HassEntry
+    from custom_components.ai_conversation.const import DOMAIN, CONF_BASE, CONF_API_KEY
+    from custom_components.ai_conversation.conversation import ConversationEntity
+    from custom_components.ai_conversation.tts import TextToSpeechEntity
+    from custom_components.ai_conversation.stt import SpeechToTextEntity
+
+    results = []
+    async with async_test_home_assistant() as hass:
+        hass.data.setdefault(DOMAIN, {})
+        config_entry = MockConfigEntry(
+            domain=DOMAIN,
+            title="Stub",
+            data={CONF_BASE: base_url, CONF_API_KEY: "stub"},
+            subentries_data=bench_subentries("stub-model-0"),
+        )
+        config_entry.add_to_hass(hass)
+        entry = await HassEntry.async_init(hass, config_entry)
+        subentries = {sub.subentry_type: sub for sub in config_entry.subentries.values()}
+        agent = ConversationEntity(entry, subentries["conversation"])
+        tts = TextToSpeechEntity(entry, subentries["tts"])
+        stt = SpeechToTextEntity(entry, subentries["stt"])
+        for entity in (agent, tts, stt):
+            entry.entities[entity.entity_id] = entity
+        api = await async_echo_api_instance(hass)
+
+        def new_chat_log(text, tools=False):
+            chat_log = ChatLog(hass, f"bench-{time.perf_counter_ns()}")
+            chat_log.async_add_user_content(conversation.UserContent(content=text))
+            if tools:
+                chat_log.llm_api = api
+            return chat_log
+
+        async def chat(i):
+            await agent._async_handle_chat_log(new_chat_log(f"hello {i}"))
+        results.append(await measure("conversation.chat", chat, args.requests, args.concurrency, args.memory))
+
+        async def chat_tools(i):
+            await agent._async_handle_chat_log(new_chat_log(f"use tools {i}", tools=True))
+        results.append(await measure("conversation.tools", chat_tools, args.requests, args.concurrency, args.memory))
+
+        reply = " ".join(f"This is sentence {i} of the reply." for i in range(8))
+
+        async def tts_stream(_):
+            request = TTSAudioRequest(
+                language="en", options={}, message_gen=async_iter(reply.split(" ")),
+            )
+            response = await tts.async_stream_tts_audio(request)
+            async for _chunk in response.data_gen:
+                pass
+        results.append(await measure("tts.stream", tts_stream, args.requests, args.concurrency, args.memory))
+
+        async def tts_full(_):
+            await tts.async_get_tts_audio(reply, "en", {})
+        results.append(await measure("tts.full", tts_full, args.requests, args.concurrency, args.memory))
+
+        audio = wav_sentence(seconds=3, rate=16000)
+        metadata = SpeechMetadata(
+            language="en",
+            format=AudioFormats.WAV,
+            codec=AudioCodecs.PCM,
+            bit_rate=AudioBitRates.BITRATE_16,
+            sample_rate=AudioSampleRates.SAMPLERATE_16000,
+            channel=AudioChannels.CHANNEL_MONO,
+        )
+
+        async def transcribe(_):
+            chunks = [audio[i:i + 3200] for i in range(0, len(audio), 3200)]
+            await stt.async_process_audio_stream(metadata, async_iter(chunks))
+        results.append(await measure("stt.transcribe", transcribe, args.requests, args.concurrency, args.memory))
+
+        if not args.skip_mcp:
+            results.extend(await run_mcp(args, hass, agent, new_chat_log))
+
+        await hass.async_stop(force=True)
+    return results
+
+
+async def run_mcp(args, hass, agent, new_chat_log):
+    from aiohttp import web
+    from homeassistant.core import SupportsResponse
+    from homeassistant.components.http import KEY_HASS, KEY_AUTHENTICATED
+    from mcp import ClientSession
+    from mcp.client.sse import sse_client
+    from custom_components.ai_conversation.const import DOMAIN
+    from custom_components.ai_conversation.http import (
+        ModelContextProtocolSSEView, ModelContextProtocolMessagesView,
+    )
+
+    async def process(call):
+        chat_log = new_chat_log(call.data["text"])
+        await agent._async_handle_chat_log(chat_log)
+        return {"response": chat_log.content[-1].content}
+    hass.services.async_register("conversation", "process", process, supports_response=SupportsResponse.ONLY)
+
+    @web.middleware
+    async def authenticated(request, handler):
+        request[KEY_AUTHENTICATED] = True
+        return await handler(request)
+
+    app = web.Application(middlewares=[authenticated])
+    app[KEY_HASS] = hass
+    for view in (ModelContextProtocolSSEView(), ModelContextProtocolMessagesView()):
+        view.register(hass, app, app.router)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    results = []
+    try:
+        url = f"http://127.0.0.1:{port}/{DOMAIN}/sse?agent_id={agent.entity_id}"
+        async with sse_client(url) as (read, write), ClientSession(read, write) as session:
+            await session.initialize()
+
+            async def call_tool(i):
+                await session.call_tool("ha_conversation", {"text": f"hello {i}"})
+            # one MCP session handles requests in order
+            results.append(await measure("mcp.call_tool", call_tool, args.requests, 1, args.memory))
+    finally:
+        await runner.cleanup()
+    return results
+
+
+def print_report(results):
+    rows = [result.as_dict() for result in results]
+    header = ["name", "count", "ops_per_sec", "p50_ms", "p95_ms", "p99_ms", "peak_kib"]
+    widths = [max(len(h), *(len(str(row[h])) for row in rows)) for h in header]
+    print("  ".join(h.ljust(w) for h, w in zip(header, widths)))
+    for row in rows:
+        print("  ".join(str(row[h]).ljust(w) for h, w in zip(header, widths)))
+    return rows
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", choices=["micro", "e2e", "baseline"], help="run one group only")
+    parser.add_argument("--requests", type=int, default=100, help="requests per e2e scenario")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--iterations", type=int, default=500, help="iterations per micro benchmark")
+    parser.add_argument("--latency", type=float, default=0.0, help="stub latency in seconds")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="stub delay between streamed chunks")
+    parser.add_argument("--reply-words", type=int, default=40)
+    parser.add_argument("--tool-calls", type=int, default=2)
+    parser.add_argument("--base-url", help="use an already running stub server")
+    parser.add_argument("--skip-mcp", action="store_true")
+    parser.add_argument("--memory", action="store_true", help="track peak memory with tracemalloc (slower)")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    results = []
+    if args.only in (None, "micro"):
+        results.extend(await run_micro(args))
+    if args.only != "micro":
+        server = None
+        base_url = args.base_url
+        if not base_url:
+            server = await StubServer(
+                latency=args.latency,
+                token_delay=args.token_delay,
+                reply_words=args.reply_words,
+                tool_calls=args.tool_calls,
+            ).start()
+            base_url = server.base_url
+        try:
+            results.extend(await run_baseline(args, base_url))
+            if args.only != "baseline":
+                results.extend(await run_e2e(args, base_url))
+        finally:
+            if server:
+                await server.stop()
+
+    rows = print_report(results)
+    if args.json:
+        pathlib.Path(args.json).write_text(json.dumps(rows, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
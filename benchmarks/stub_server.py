@@ -0,0 +1,276 @@
+"""Local OpenAI-compatible stub server for benchmarks.
+
+python benchmarks/stub_server.py --port 18080 --latency 0.05
+"""
+import argparse
+import asyncio
+import io
+import json
+import math
+import struct
+import time
+import wave
+from aiohttp import web
+
+
+class StubServer:
+    def __init__(
+        self,
+        latency=0.0,
+        token_delay=0.0,
+        reply_words=20,
+        tool_calls=0,
+        audio_seconds=1.0,
+        sample_rate=24000,
+        chunk_size=4096,
+    ):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.reply_words = reply_words
+        self.tool_calls = tool_calls
+        self.audio_seconds = audio_seconds
+        self.sample_rate = sample_rate
+        self.chunk_size = chunk_size
+        self.requests = 0
+        self.runner = None
+        self.port = None
+        self._wav_cache = {}
+        self.files = {}
+        self.batches = {}
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    def create_app(self):
+        app = web.Application(client_max_size=64 * 1024 ** 2)
+        app.router.add_get("/v1/models", self.models)
+        app.router.add_post("/v1/chat/completions", self.chat_completions)
+        app.router.add_post("/v1/audio/speech", self.audio_speech)
+        app.router.add_post("/v1/audio/transcriptions", self.audio_transcriptions)
+        app.router.add_post("/v1/files", self.upload_file)
+        app.router.add_get("/v1/files/{file_id}/content", self.file_content)
+        app.router.add_post("/v1/batches", self.create_batch)
+        app.router.add_get("/v1/batches/{batch_id}", self.get_batch)
+        return app
+
+    async def start(self, host="127.0.0.1", port=0):
+        self.runner = web.AppRunner(self.create_app())
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+
+    async def delay(self, request):
+        self.requests += 1
+        latency = float(request.query.get("latency", self.latency))
+        if latency:
+            await asyncio.sleep(latency)
+
+    async def models(self, request):
+        await self.delay(request)
+        return web.json_response({
+            "object": "list",
+            "data": [{"id": f"stub-model-{i}", "object": "model"} for i in range(3)],
+        })
+
+    def reply_text(self):
+        return " ".join(f"word{i}." if i % 8 == 7 else f"word{i}" for i in range(self.reply_words))
+
+    def tool_call_message(self, messages):
+        """Call tools on the first turn, answer once tool results are present."""
+        if not self.tool_calls or any(m.get("role") == "tool" for m in messages):
+            return None
+        return [
+            {
+                "id": f"call_{i}",
+                "type": "function",
+                "function": {"name": "echo", "arguments": json.dumps({"text": f"tool {i}"})},
+            }
+            for i in range(self.tool_calls)
+        ]
+
+    def completion(self, data):
+        messages = data.get("messages") or []
+        tool_calls = self.tool_call_message(messages) if data.get("tools") else None
+        message = {"role": "assistant", "content": None if tool_calls else self.reply_text()}
+        if tool_calls:
+            message["tool_calls"] = tool_calls
+        usage = {
+            "prompt_tokens": len(json.dumps(data)) // 4,
+            "completion_tokens": self.reply_words,
+            "total_tokens": len(json.dumps(data)) // 4 + self.reply_words,
+        }
+        return {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": data.get("model"),
+            "choices": [{"index": 0, "message": message, "finish_reason": "stop"}],
+            "usage": usage,
+        }
+
+    async def chat_completions(self, request):
+        data = await request.json()
+        await self.delay(request)
+        result = self.completion(data)
+        message, usage = result["choices"][0]["message"], result["usage"]
+        tool_calls = message.get("tool_calls")
+        if not data.get("stream"):
+            return web.json_response(result)
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        deltas = [{"role": "assistant", "tool_calls": tool_calls}] if tool_calls else [
+            {"content": f"{word} "} for word in message["content"].split()
+        ]
+        for delta in deltas:
+            chunk = {"id": "chatcmpl-stub", "choices": [{"index": 0, "delta": delta}]}
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            if self.token_delay:
+                await asyncio.sleep(self.token_delay)
+        await response.write(f"data: {json.dumps({'choices': [], 'usage': usage})}\n\n".encode())
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    def wav_bytes(self, seconds):
+        if seconds not in self._wav_cache:
+            frames = int(self.sample_rate * seconds)
+            samples = b"".join(
+                struct.pack("<h", int(8000 * math.sin(2 * math.pi * 440 * i / self.sample_rate)))
+                for i in range(frames)
+            )
+            buf = io.BytesIO()
+            with wave.open(buf, "wb") as w:
+                w.setnchannels(1)
+                w.setsampwidth(2)
+                w.setframerate(self.sample_rate)
+                w.writeframes(samples)
+            self._wav_cache[seconds] = buf.getvalue()
+        return self._wav_cache[seconds]
+
+    async def audio_speech(self, request):
+        data = await request.json()
+        await self.delay(request)
+        fmt = data.get("response_format") or "wav"
+        seconds = max(0.1, self.audio_seconds * len(data.get("input", "")) / 40)
+        body = self.wav_bytes(round(seconds, 1))
+        if fmt == "pcm":
+            body = body[44:]
+        # mp3 is served as wav bytes, only the content type matters to the integration
+        content_type = {"mp3": "audio/mpeg", "pcm": "audio/pcm"}.get(fmt, "audio/wav")
+        response = web.StreamResponse(headers={"Content-Type": content_type})
+        await response.prepare(request)
+        for i in range(0, len(body), self.chunk_size):
+            await response.write(body[i:i + self.chunk_size])
+            if self.token_delay:
+                await asyncio.sleep(self.token_delay)
+        await response.write_eof()
+        return response
+
+    async def audio_transcriptions(self, request):
+        size = 0
+        reader = await request.multipart()
+        async for part in reader:
+            while chunk := await part.read_chunk():
+                size += len(chunk)
+        await self.delay(request)
+        return web.json_response({
+            "text": f"transcribed {size} bytes",
+            "usage": {"type": "tokens", "input_tokens": size // 1000, "output_tokens": 5},
+        })
+
+    async def upload_file(self, request):
+        reader = await request.multipart()
+        content, purpose = b"", None
+        async for part in reader:
+            if part.name == "file":
+                content = await part.read()
+            elif part.name == "purpose":
+                purpose = await part.text()
+        file_id = f"file-{len(self.files) + 1}"
+        self.files[file_id] = content
+        return web.json_response({"id": file_id, "object": "file", "bytes": len(content), "purpose": purpose})
+
+    async def file_content(self, request):
+        if (content := self.files.get(request.match_info["file_id"])) is None:
+            raise web.HTTPNotFound
+        return web.Response(body=content, content_type="application/jsonl")
+
+    async def create_batch(self, request):
+        data = await request.json()
+        if (content := self.files.get(data.get("input_file_id"))) is None:
+            raise web.HTTPBadRequest(text="input file not found")
+        batch_id = f"batch-{len(self.batches) + 1}"
+        output = []
+        for line in content.decode().splitlines():
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            output.append(json.dumps({
+                "id": f"req-{len(output)}",
+                "custom_id": item.get("custom_id"),
+                "response": {"status_code": 200, "body": self.completion(item.get("body") or {})},
+                "error": None,
+            }))
+        output_file_id = f"file-{len(self.files) + 1}"
+        self.files[output_file_id] = "\n".join(output).encode()
+        self.batches[batch_id] = {
+            "id": batch_id,
+            "object": "batch",
+            "endpoint": data.get("endpoint"),
+            "input_file_id": data.get("input_file_id"),
+            "status": "in_progress",
+            "output_file_id": None,
+            "request_counts": {"total": len(output), "completed": 0, "failed": 0},
+            "_output_file_id": output_file_id,
+        }
+        return web.json_response(self.public_batch(batch_id))
+
+    async def get_batch(self, request):
+        batch_id = request.match_info["batch_id"]
+        if not (batch := self.batches.get(batch_id)):
+            raise web.HTTPNotFound
+        # completes on the first poll
+        batch["status"] = "completed"
+        batch["output_file_id"] = batch["_output_file_id"]
+        batch["request_counts"]["completed"] = batch["request_counts"]["total"]
+        return web.json_response(self.public_batch(batch_id))
+
+    def public_batch(self, batch_id):
+        return {k: v for k, v in self.batches[batch_id].items() if not k.startswith("_")}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before each response")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="seconds between streamed chunks")
+    parser.add_argument("--reply-words", type=int, default=20)
+    parser.add_argument("--tool-calls", type=int, default=0)
+    parser.add_argument("--audio-seconds", type=float, default=1.0)
+    args = parser.parse_args()
+    server = StubServer(
+        latency=args.latency,
+        token_delay=args.token_delay,
+        reply_words=args.reply_words,
+        tool_calls=args.tool_calls,
+        audio_seconds=args.audio_seconds,
+    )
+    await server.start(args.host, args.port)
+    print(f"Stub server listening on {server.base_url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
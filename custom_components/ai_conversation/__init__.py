@@ -1,15 +1,35 @@
 """The Conversation integration."""
 from __future__ import annotations
 
-from aiohttp import hdrs
+import asyncio
+import time
+from collections import deque
+from datetime import timedelta
+from aiohttp import hdrs, ClientError, ClientTimeout
 from homeassistant.helpers.entity import Entity, async_generate_entity_id
 from homeassistant.helpers import device_registry as dr
 from homeassistant.helpers.aiohttp_client import async_create_clientsession
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.dispatcher import async_dispatcher_send
 
 from . import http
 from .const import *
 from .schemas import *
 from .services import ServiceManager
+from .cache import StoreCache
+from .capabilities import ModelCapabilities, CapabilityProber, CAPABILITIES_TTL
+from .usage import UsageTracker
+from .metrics import LatencyStats, RequestTiming, TraceWriter, create_trace_config
+from .context import ContextWindow, RollingSummary, estimate_tokens
+from .tool_select import ToolIndex
+from .entity_index import EntityIndex, async_import_numpy
+from .scheduler import RequestScheduler, parse_retry_after, MAX_RETRY_AFTER
+from .codec import WireCodec
+from .catalog import ModelCatalog
+from .cascade import ModelCascade
+from .batch import BatchManager
+from .jobs import JobQueue
+from .keypool import ApiKey, KeyPool, QUARANTINE_STATUSES
 
 
 async def async_setup(hass: HomeAssistant, config: dict) -> bool:
@@ -17,12 +37,24 @@ async def async_setup(hass: HomeAssistant, config: dict) -> bool:
     hass.data.setdefault(DOMAIN, {})
     http.async_register(hass)
     ServiceManager(hass).setup_explain_media()
+    ServiceManager(hass).setup_refresh_models()
+    ServiceManager(hass).setup_transcribe()
+    ServiceManager(hass).setup_batches()
     return True
 
 
 async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> bool:
     """Set up from a config entry."""
-    await HassEntry.async_init(hass, config_entry)
+    entry = await HassEntry.async_init(hass, config_entry)
+    await entry.usage.async_load()
+    await entry.batches.async_load()
+    await entry.async_setup_capabilities()
+    config_entry.async_create_background_task(
+        hass, entry.catalog.async_revalidate(), f"{DOMAIN}_models_{entry.id}",
+    )
+    config_entry.async_create_background_task(
+        hass, entry.async_warm_up(), f"{DOMAIN}_warmup_{entry.id}",
+    )
     await hass.config_entries.async_forward_entry_setups(config_entry, PLATFORMS)
     config_entry.async_on_unload(config_entry.add_update_listener(async_reload_entry))
     return True
@@ -36,6 +68,15 @@ async def async_unload_entry(hass: HomeAssistant, config_entry: ConfigEntry) ->
     entry = await HassEntry.async_init(hass, config_entry)
     return await entry.async_unload()
 
+async def async_remove_entry(hass: HomeAssistant, config_entry: ConfigEntry):
+    """Remove stored data of Config Entry."""
+    await UsageTracker(hass, config_entry.entry_id).async_remove()
+    await BatchManager.async_remove_store(hass, config_entry.entry_id)
+
+
+class DeadlineExceeded(HomeAssistantError):
+    """Provider call did not finish before its deadline."""
+
 
 class HassEntry:
     ALL: dict[str, "HassEntry"] = {}
@@ -47,6 +88,28 @@ class HassEntry:
         self.hass = hass
         self.entry = entry
         self.entities = {}
+        self.capabilities: dict[str, ModelCapabilities] = {}
+        self.usage = UsageTracker(hass, self.id)
+        self.latency: dict[str, LatencyStats] = {}
+        self.codec = WireCodec()
+        self.batches = BatchManager(self)
+        self.explain_jobs = JobQueue(
+            self, "explain_media", EVENT_EXPLAIN_MEDIA_DONE,
+            concurrency=EXPLAIN_JOB_CONCURRENCY, max_size=EXPLAIN_QUEUE_SIZE,
+        )
+        self.transcribe_slots = asyncio.Semaphore(TRANSCRIBE_ENTRY_CONCURRENCY)
+        self.keys = KeyPool(self.get_config(CONF_API_KEY))
+        # limits are per key, so they scale with the pool
+        scale = max(1, len(self.keys))
+        self.scheduler = RequestScheduler(
+            rpm=(self.get_config(CONF_RPM_LIMIT) or 0) * scale,
+            tpm=(self.get_config(CONF_TPM_LIMIT) or 0) * scale,
+        )
+        self.last_request = 0.0
+        self.pings: deque[float] = deque()
+        self.tracer = None
+        if trace_file := self.get_config(CONF_TRACE_FILE):
+            self.tracer = TraceWriter(hass, trace_file)
 
     @staticmethod
     async def async_init(hass: HomeAssistant, entry: ConfigEntry):
@@ -65,6 +128,15 @@ class HassEntry:
     def __getattr__(self, item):
         return getattr(self.entry, item, None)
 
+    def get_device_info(self, subentry: ConfigSubentry):
+        return dr.DeviceInfo(
+            identifiers={(DOMAIN, subentry.subentry_id)},
+            name=subentry.title,
+            model=subentry.data.get(CONF_MODEL, ""),
+            manufacturer=self.entry.title,
+            entry_type=dr.DeviceEntryType.SERVICE,
+        )
+
     def get_config(self, key=None, default=None):
         dat = {
             **self.entry.data,
@@ -78,28 +150,180 @@ class HassEntry:
         if self.session:
             return self.session
         base_url = self.get_config(CONF_BASE).rstrip('/')
-        self.session = async_create_clientsession(self.hass, base_url=f"{base_url}/")
+        self.session = async_create_clientsession(
+            self.hass,
+            base_url=f"{base_url}/",
+            trace_configs=[create_trace_config()],
+        )
         return self.session
 
-    def get_http_headers(self, headers=None):
+    def get_http_headers(self, headers=None, api_key=None):
         extra = {}
-        if apikey := self.get_config(CONF_API_KEY):
-            extra[hdrs.AUTHORIZATION] = f"Bearer {apikey}"
+        if api_key := api_key or self.keys.pick():
+            extra[hdrs.AUTHORIZATION] = f"Bearer {api_key.key}"
         return {
             **extra,
             **(headers or {}),
         }
 
-    async def async_post(self, api, json_data=None, **kwargs):
+    @property
+    def catalog(self):
+        return ModelCatalog(self.hass, self.get_config(), self.get_http_session())
+
+    async def async_warm_up(self):
+        """Open pooled connections ahead of the first voice command and keep them warm while idle."""
+        if count := int(self.get_config(CONF_WARMUP_CONNECTIONS) or 0):
+            await asyncio.gather(*(self.async_ping("warmup") for _ in range(count)))
+        if interval := int(self.get_config(CONF_KEEPALIVE_INTERVAL) or 0):
+            self.entry.async_on_unload(async_track_time_interval(
+                self.hass, self._async_keepalive, timedelta(seconds=interval),
+                name=f"{DOMAIN}_keepalive_{self.id}",
+            ))
+
+    async def _async_keepalive(self, _now=None):
+        interval = int(self.get_config(CONF_KEEPALIVE_INTERVAL) or 0)
+        budget = self.get_config(CONF_KEEPALIVE_BUDGET)
+        budget = DEFAULT_KEEPALIVE_BUDGET if budget is None else int(budget)
+        now = time.monotonic()
+        if now - self.last_request < interval:
+            return
+        while self.pings and now - self.pings[0] > 3600:
+            self.pings.popleft()
+        if len(self.pings) >= budget:
+            return
+        self.pings.append(now)
+        await self.async_ping("keepalive")
+
+    async def async_ping(self, name="keepalive"):
+        """Cheap request only to open or reuse a pooled connection."""
+        timing = RequestTiming(name, self.get_latency("connection"), self.tracer)
+        try:
+            async with self.get_http_session().head(
+                "models",
+                headers=self.get_http_headers(),
+                timeout=ClientTimeout(total=float(self.get_config(CONF_MODELS_TIMEOUT) or DEFAULT_TIMEOUTS["models"])),
+                trace_request_ctx=timing,
+            ):
+                pass
+        except (ClientError, TimeoutError) as exc:
+            LOGGER.debug("Failed to %s connection to %s: %s", name, self.get_config(CONF_BASE), exc)
+        timing.finish()
+
+    def get_latency(self, key) -> LatencyStats:
+        if key not in self.latency:
+            self.latency[key] = LatencyStats()
+        return self.latency[key]
+
+    async def async_post(
+        self, api, json_data=None, timing: RequestTiming | None = None, priority: int | None = None,
+        api_key: ApiKey | None = None, **kwargs
+    ):
         http = self.get_http_session()
-        headers = self.get_http_headers()
+        headers = {}
         LOGGER.debug("POST to %s: %s", api, json_data)
-        return await http.post(api, json=json_data, headers=headers, **kwargs)
+        if timing is not None:
+            kwargs["trace_request_ctx"] = timing
+            if not self.last_request:
+                timing.attrs["first_request"] = True
+        self.last_request = time.monotonic()
+        body = None
+        if json_data is not None:
+            body = self.codec.dumps(json_data)
+            headers[hdrs.CONTENT_TYPE] = "application/json"
+        # ~4 bytes per token, without encoding the payload a second time
+        tokens = (len(body) + 3) // 4 if self.scheduler.tokens and body else 0
+        # form data can not be sent twice
+        retries = 2 if json_data is not None else 0
+        while True:
+            waited = await self.scheduler.async_acquire(priority, tokens)
+            if timing is not None:
+                timing.phases["queue"] = timing.phases.get("queue", 0) + waited
+            if body is not None:
+                kwargs["data"] = body
+            key = self.keys.acquire(api_key)
+            if timing is not None and key:
+                timing.attrs["api_key"] = key.name
+            try:
+                res = await http.post(api, headers=self.get_http_headers(headers, key), **kwargs)
+            except BaseException:
+                self.keys.release(key)
+                raise
+            retry_after = parse_retry_after(res.headers.get(hdrs.RETRY_AFTER))
+            self.keys.release(key, res.status, retry_after)
+            if res.status in QUARANTINE_STATUSES and retries > 0 and not api_key and self.keys.has_other(key):
+                # other keys of the pool may still have quota
+                retries -= 1
+                res.release()
+                continue
+            if res.status != 429:
+                return res
+            if retry_after is None:
+                return res
+            self.scheduler.pause(min(retry_after, MAX_RETRY_AFTER))
+            if retries <= 0 or retry_after > MAX_RETRY_AFTER:
+                return res
+            retries -= 1
+            res.release()
+
+    async def async_get(self, api, priority: int | None = None, api_key: ApiKey | None = None, **kwargs):
+        await self.scheduler.async_acquire(priority)
+        self.last_request = time.monotonic()
+        key = self.keys.acquire(api_key)
+        try:
+            res = await self.get_http_session().get(api, headers=self.get_http_headers(api_key=key), **kwargs)
+        except BaseException:
+            self.keys.release(key)
+            raise
+        self.keys.release(key, res.status, parse_retry_after(res.headers.get(hdrs.RETRY_AFTER)))
+        return res
+
+    def get_capabilities(self, model):
+        return self.capabilities.get(model) or ModelCapabilities()
 
-    async def async_chat_completions(self, data: ChatCompletions):
-        res = await self.async_post("chat/completions", data)
-        result = ChatCompletionsResult(await res.json())
+    async def async_setup_capabilities(self):
+        cache = await StoreCache.async_get_instance(self.hass, "capabilities", ttl=CAPABILITIES_TTL)
+        base = self.get_config(CONF_BASE)
+        models = {
+            model
+            for sub in self.entry.subentries.values()
+            if sub.subentry_type == conversation.DOMAIN
+            for model in (sub.data.get(CONF_MODEL), sub.data.get(CONF_FAST_MODEL))
+        }
+        for model in filter(None, models):
+            caps = cache.get(f"{self.id}:{model}")
+            if caps and caps.get("base") == base:
+                self.capabilities[model] = ModelCapabilities(caps)
+                continue
+            self.entry.async_create_background_task(
+                self.hass,
+                self.async_probe_capabilities(model, cache),
+                f"{DOMAIN}_probe_{model}",
+            )
+
+    async def async_probe_capabilities(self, model, cache: StoreCache):
+        prober = CapabilityProber(self, model)
+        caps = await prober.async_probe()
+        if caps is None:
+            return None
+        caps.base = self.get_config(CONF_BASE)
+        self.capabilities[model] = caps
+        if not prober.partial:
+            cache.set(f"{self.id}:{model}", dict(caps))
+        return caps
+
+    async def async_chat_completions(self, data: ChatCompletions, timing: RequestTiming | None = None):
+        res = await self.async_post("chat/completions", data, timing=timing)
+        try:
+            result = ChatCompletionsResult(self.codec.loads(await res.read()))
+        except BaseException:
+            # release the pooled connection of a cancelled or broken response
+            res.close()
+            raise
         result.response = res
+        if usage := result.usage:
+            self.scheduler.consume_tokens(usage.completion_tokens)
+            if timing is not None:
+                self.keys.record_tokens(timing.attrs.get("api_key"), usage.total_tokens)
         return result
 
 
@@ -116,13 +340,12 @@ class BasicEntity(Entity):
         name = self.subentry.data.get(CONF_NAME) or self._default_name
         self._attr_name = f"{name} ({self.model})"
         self._attr_unique_id = f'{self.domain}.{self.subentry.subentry_id}'
-        self._attr_device_info = dr.DeviceInfo(
-            identifiers={(DOMAIN, self.subentry.subentry_id)},
-            name=self.subentry.title,
-            model=self.model,
-            manufacturer=entry.title,
-            entry_type=dr.DeviceEntryType.SERVICE,
-        )
+        self._attr_device_info = entry.get_device_info(self.subentry)
+        self.summaries = RollingSummary()
+        self.tool_index: ToolIndex | None = None
+        self.tool_stats = {"requests": 0, "pruned": 0, "tokens_before": 0, "tokens_after": 0, "fallbacks": 0}
+        self.entity_stats = {"requests": 0, "filtered": 0, "entities_before": 0, "entities_after": 0, "tokens_before": 0, "tokens_after": 0}
+        self.cascade_stats = {"turns": 0, "escalations": 0, "reasons": {}}
         self.on_init()
         if self._object_id is None:
             self._object_id = slugify(self._default_name) + "_{}"
@@ -138,6 +361,21 @@ class BasicEntity(Entity):
     async def async_added_to_hass(self):
         self.entry.entities[self.entity_id] = self
 
+    @property
+    def latency(self) -> LatencyStats:
+        return self.entry.get_latency(self.subentry.subentry_id)
+
+    def start_timing(self, name) -> RequestTiming:
+        return RequestTiming(name, self.latency, self.entry.tracer)
+
+    @callback
+    def record_usage(self, usage: dict | None = None, requests=1, error=None):
+        self.entry.usage.async_record(self.subentry, usage, requests=requests, error=error)
+
+    def get_timeout(self, kind):
+        conf = CONF_TURN_TIMEOUT if kind == "turn" else CONF_TIMEOUT
+        return float(self.subentry.data.get(conf) or DEFAULT_TIMEOUTS[kind])
+
     async def _async_handle_chat_log(
         self,
         chat_log: conversation.ChatLog,
@@ -149,21 +387,43 @@ class BasicEntity(Entity):
             user=chat_log.conversation_id,
         )
 
+        codec = self.entry.codec
+        entity_top_k = self.subentry.data.get(CONF_ENTITY_TOP_K)
+        if entity_top_k and self.subentry.data.get(CONF_ENTITY_VECTORS):
+            await async_import_numpy(self.hass)
+        filtered = False
         for content in chat_log.content:
-            if msg := ChatMessage.from_conversation_content(content):
+            if content.role == "system" and content.content and entity_top_k and (
+                prompt := self.select_entities(content.content, chat_log, int(entity_top_k))
+            ):
+                # only the entities relevant to this utterance
+                data.messages.append(ChatMessage(role="system", content=prompt))
+                filtered = True
+            elif msg := ChatMessage.from_conversation_content(content):
                 data.messages.append(msg)
 
-        if chat_log.llm_api:
+        caps = self.entry.get_capabilities(self.model)
+        if chat_log.llm_api and caps.tools is not False:
+            serializer = chat_log.llm_api.custom_serializer
+            # converted every turn, schemas of scripts and selectors have no stable key of their own
             for tool in chat_log.llm_api.tools:
-                func = ChatTool.from_hass_llm_tool(tool, chat_log.llm_api.custom_serializer)
-                data.tools.append(func)
+                data.tools.append(codec.intern(ChatTool.from_hass_llm_tool(tool, serializer)))
+        all_tools = data.tools
+        if (top_k := self.subentry.data.get(CONF_TOOL_TOP_K)) and len(all_tools) > int(top_k):
+            data["tools"] = self.select_tools(all_tools, chat_log, int(top_k))
 
         if structure and structure_name:
             schema = ResponseJsonSchema(structure_name, structure, chat_log.llm_api)
-            data.response_format = schema
-            if "bigmodel.cn" in self.entry.get_config(CONF_BASE):
-                # https://docs.bigmodel.cn/api-reference/%E6%A8%A1%E5%9E%8B-api/%E5%AF%B9%E8%AF%9D%E8%A1%A5%E5%85%A8#body-response-format
-                data.response_format = Dict(type="json_object")
+            response_format, inline_schema = caps.response_format(schema)
+            if inline_schema is None:
+                # not probed yet, fallback to known provider quirks
+                response_format, inline_schema = schema, False
+                if "bigmodel.cn" in self.entry.get_config(CONF_BASE):
+                    # https://docs.bigmodel.cn/api-reference/%E6%A8%A1%E5%9E%8B-api/%E5%AF%B9%E8%AF%9D%E8%A1%A5%E5%85%A8#body-response-format
+                    response_format, inline_schema = Dict(type="json_object"), True
+            if response_format:
+                data.response_format = response_format
+            if inline_schema:
                 data.messages.append(ChatMessage(
                     role="system",
                     content=(
@@ -172,32 +432,192 @@ class BasicEntity(Entity):
                     ),
                 ))
 
-        for _iteration in range(MAX_TOOL_ITERATIONS):
-            result = await self.async_chat_completions(**data)
-            if not result.message:
-                continue
-            data.messages.extend(
-                [
-                    msg
-                    async for content in chat_log.async_add_delta_content_stream(
-                        self.entity_id, result.message.to_conversation_content_delta()
+        if budget := self.subentry.data.get(CONF_CONTEXT_TOKENS):
+            await self.async_fit_context(data, chat_log.conversation_id, int(budget))
+
+        cascade = None
+        if (fast_model := self.subentry.data.get(CONF_FAST_MODEL)) and fast_model != self.model:
+            if ModelCascade.supports(self.entry.get_capabilities(fast_model), data):
+                cascade = ModelCascade(self.subentry.data, self.cascade_stats)
+                data["model"] = fast_model
+            else:
+                # tools or response format were picked for the main model, the fast one rejects them
+                self.cascade_stats["unsupported"] = self.cascade_stats.get("unsupported", 0) + 1
+        tool_names = {tool["function"]["name"] for tool in all_tools}
+
+        timeout = self.get_timeout("turn")
+        start = time.perf_counter()
+        try:
+            async with asyncio.timeout(timeout):
+                for _iteration in range(MAX_TOOL_ITERATIONS):
+                    if budget and _iteration:
+                        # tool results of the previous iteration may have outgrown the budget
+                        await self.async_fit_context(data, chat_log.conversation_id, int(budget), summarize=False)
+                    timing = self.start_timing("tool_iteration")
+                    self.send_progress(chat_log, "started", _iteration)
+                    try:
+                        result = await self.async_chat_completions(**data)
+                    except HomeAssistantError as err:
+                        if not (cascade and (reason := cascade.check_error(err))):
+                            raise
+                        self.escalate(data, cascade, reason)
+                        timing.finish(iteration=_iteration, escalated=reason)
+                        continue
+                    if entity_top_k and _iteration == 0:
+                        # time to the first answer, with and without the entity overview pruned
+                        self.latency.add(f"entities.{'filtered' if filtered else 'full'}", timing.elapsed())
+                    if cascade and (reason := cascade.check_response(result.message, tool_names)):
+                        # retry the same messages on the strong model, the bad answer is not logged
+                        self.escalate(data, cascade, reason)
+                        timing.finish(iteration=_iteration, escalated=reason)
+                        continue
+                    if not result.message:
+                        timing.finish(iteration=_iteration)
+                        continue
+                    contents = [
+                        content
+                        async for content in chat_log.async_add_delta_content_stream(
+                            self.entity_id, result.message.to_conversation_content_delta()
+                        )
+                    ]
+                    data.messages.extend(
+                        msg for content in contents
+                        if (msg := ChatMessage.from_conversation_content(content))
                     )
-                    if (msg := ChatMessage.from_conversation_content(content))
-                ]
-            )
-            if not chat_log.unresponded_tool_results:
-                break
+                    timing.finish(
+                        iteration=_iteration,
+                        tool_calls=len(result.message.tool_calls or []),
+                        model=data.get("model"),
+                    )
+                    self.send_progress(
+                        chat_log, "finished", _iteration,
+                        text="".join(c.content for c in contents if c.role == "assistant" and c.content),
+                        tools=[c.tool_name for c in contents if c.role == "tool_result"],
+                    )
+                    if data.tools is not all_tools and result.message.tool_calls:
+                        sent = {tool["function"]["name"] for tool in data.tools}
+                        if any(call.name not in sent for call in result.message.tool_calls):
+                            # the model asked for a pruned tool, offer the full set from now on
+                            self.tool_stats["fallbacks"] += 1
+                            data["tools"] = all_tools
+                    if not chat_log.unresponded_tool_results:
+                        break
+                    if cascade and (reason := cascade.check_iteration(contents)):
+                        self.escalate(data, cascade, reason)
+        except TimeoutError as err:
+            self.record_usage(error=ERROR_TIMEOUT)
+            raise DeadlineExceeded(f"Conversation turn exceeded {timeout}s deadline") from err
+        if cascade:
+            self.latency.add(f"cascade.{cascade.tier}", (time.perf_counter() - start) * 1000)
+
+    def send_progress(self, chat_log: conversation.ChatLog, status, iteration, **kwargs):
+        """Progress of a turn for listeners of the conversation, e.g. MCP clients."""
+        async_dispatcher_send(
+            self.hass, SIGNAL_TURN_PROGRESS.format(chat_log.conversation_id),
+            {"status": status, "iteration": iteration, **kwargs},
+        )
+
+    def escalate(self, data: ChatCompletions, cascade: ModelCascade, reason):
+        LOGGER.debug("Escalating %s from %s to %s: %s", self.entity_id, data.get("model"), self.model, reason)
+        cascade.escalate(reason)
+        data["model"] = self.model
+
+    @staticmethod
+    def user_query(chat_log: conversation.ChatLog, turns=1):
+        texts = []
+        for content in reversed(chat_log.content):
+            if content.role == "user" and content.content:
+                texts.insert(0, content.content)
+                if len(texts) >= turns:
+                    break
+        return "\n".join(texts)
+
+    def select_tools(self, tools: list[ChatTool], chat_log: conversation.ChatLog, top_k: int):
+        query = self.user_query(chat_log)
+        if self.tool_index is None or self.tool_index.key != tuple(t["function"]["name"] for t in tools):
+            self.tool_index = ToolIndex(tools)
+        pinned = self.subentry.data.get(CONF_PINNED_TOOLS) or []
+        selected = self.tool_index.select(query, top_k, pinned)
+        before, after = estimate_tokens(tools), estimate_tokens(selected)
+        self.tool_stats["requests"] += 1
+        self.tool_stats["pruned"] += len(tools) - len(selected)
+        self.tool_stats["tokens_before"] += before
+        self.tool_stats["tokens_after"] += after
+        LOGGER.debug(
+            "Selected %s/%s tools (~%s/%s tokens): %s",
+            len(selected), len(tools), after, before, [t["function"]["name"] for t in selected],
+        )
+        return selected
+
+    def select_entities(self, prompt: str, chat_log: conversation.ChatLog, top_k: int):
+        """System prompt with only the relevant part of the Assist entity overview, None to keep it whole."""
+        index = EntityIndex.get_instance(self.hass, self.entry.entry)
+        # the previous utterance too, so follow-ups like "turn it off" keep their entities
+        query = self.user_query(chat_log, turns=2)
+        result = index.filter_prompt(
+            prompt, query, top_k,
+            pinned=self.subentry.data.get(CONF_PINNED_ENTITIES),
+            vectors=self.subentry.data.get(CONF_ENTITY_VECTORS),
+        )
+        self.entity_stats["requests"] += 1
+        if not result:
+            return None
+        filtered, before, after = result
+        self.entity_stats["filtered"] += 1
+        self.entity_stats["entities_before"] += before
+        self.entity_stats["entities_after"] += after
+        self.entity_stats["tokens_before"] += estimate_tokens(prompt)
+        self.entity_stats["tokens_after"] += estimate_tokens(filtered)
+        LOGGER.debug("Selected %s/%s entities for %s: %s", after, before, self.entity_id, query)
+        return filtered
+
+    async def async_fit_context(self, data: ChatCompletions, conversation_id, budget: int, summarize=True):
+        window = ContextWindow(budget, reserved=estimate_tokens(data.get("tools")))
+        messages = window.fit(data.messages)
+        if window.dropped:
+            LOGGER.debug("Trimmed %s messages of conversation %s", len(window.dropped), conversation_id)
+        if window.dropped and summarize and (model := self.subentry.data.get(CONF_SUMMARY_MODEL)):
+            try:
+                summary = await self.summaries.async_update(self, conversation_id, window.dropped, model)
+            except HomeAssistantError as exc:
+                LOGGER.warning("Failed to summarize conversation %s: %s", conversation_id, exc)
+                summary = None
+            if summary:
+                idx = 0
+                while idx < len(messages) and messages[idx].get("role") == "system":
+                    idx += 1
+                messages.insert(idx, ChatMessage(
+                    role="system",
+                    content=f"Summary of the earlier conversation: {summary}",
+                ))
+                # the summary itself may not fit, older turns make room for it
+                messages = window.fit(messages)
+        data["messages"] = messages
 
     async def async_chat_completions(self, messages, **kwargs):
         model = kwargs.pop("model", None) or self.model
+        timeout = kwargs.pop("timeout", None) or self.get_timeout("chat")
         data = ChatCompletions(model=model, messages=messages, **kwargs)
+        timing = self.start_timing("chat")
         try:
-            result = await self.entry.async_chat_completions(data)
+            async with asyncio.timeout(timeout):
+                result = await self.entry.async_chat_completions(data, timing=timing)
+        except TimeoutError as err:
+            timing.finish(error=ERROR_TIMEOUT)
+            self.record_usage(error=ERROR_TIMEOUT)
+            LOGGER.warning('chat_completions timed out after %ss: %s', timeout, model)
+            raise DeadlineExceeded(f"API did not respond within {timeout}s") from err
         except Exception as err:
+            timing.finish(error=type(err).__name__)
+            self.record_usage(error=type(err).__name__)
             LOGGER.exception('chat_completions error: %s', data, exc_info=True)
             raise HomeAssistantError(f"Error talking to API: {err}") from err
+        usage = result.usage.to_dict() if result.usage else None
+        timing.finish(model=model, tools=len(data.get("tools") or []), usage=usage)
+        self.record_usage(usage)
         LOGGER.debug('chat_completions req: %s', data)
         if result.error:
+            self.record_usage(requests=0, error="api")
             raise HomeAssistantError(f"Error talking to API: {result.error}")
         if not result.message:
             LOGGER.warning('chat_completions response has no message: %s', result)
@@ -0,0 +1,97 @@
+import struct
+from homeassistant.helpers.importlib import async_import_module
+
+from .const import *
+
+PCM_WIDTH = 2
+STREAM_SIZE = 0xFFFFFFFF
+
+# only imported when pcm has to be converted, passthrough works without it, False when it is not installed
+np = None
+
+
+async def async_import_numpy(hass: HomeAssistant):
+    global np
+    if np is None:
+        try:
+            np = await async_import_module(hass, "numpy")
+        except ImportError as exc:
+            LOGGER.warning("numpy is not available, pcm can only be passed through: %s", exc)
+            np = False
+    return np or None
+
+
+def wav_header(rate: int, channels: int = 1, width: int = PCM_WIDTH, data_size: int | None = None):
+    """RIFF header of pcm data, unknown size marks an endless stream."""
+    riff_size = data_size + 36 if data_size is not None else STREAM_SIZE
+    data_size = data_size if data_size is not None else STREAM_SIZE
+    return b"".join([
+        b"RIFF", struct.pack("<I", riff_size), b"WAVE",
+        b"fmt ", struct.pack("<IHHIIHH", 16, 1, channels, rate, rate * channels * width, channels * width, width * 8),
+        b"data", struct.pack("<I", data_size),
+    ])
+
+
+class PcmConverter:
+    """Convert s16le pcm chunks to another rate, channel count and sample width, with optional gain in dB."""
+
+    def __init__(self, in_rate: int, out_rate: int | None = None, in_channels=1, out_channels=None, out_width=PCM_WIDTH, gain=0.0):
+        self.in_rate = in_rate
+        self.out_rate = out_rate or in_rate
+        self.in_channels = in_channels
+        self.out_channels = out_channels or in_channels
+        self.out_width = out_width
+        self.ratio = self.in_rate / self.out_rate
+        self.factor = 10 ** (float(gain or 0) / 20)
+        self.pos = 0.0
+        self.tail = None
+        self.pending = b""
+
+    @property
+    def passthrough(self):
+        return (
+            self.ratio == 1 and self.factor == 1 and
+            self.in_channels == self.out_channels and self.out_width == PCM_WIDTH
+        )
+
+    def convert(self, chunk: bytes) -> bytes:
+        data = self.pending + chunk
+        cut = len(data) - len(data) % (PCM_WIDTH * self.in_channels)
+        data, self.pending = data[:cut], data[cut:]
+        if self.passthrough or not data:
+            return data
+        if not np:
+            raise HomeAssistantError("numpy is required to convert pcm, install it or drop the preferred format")
+        samples = np.frombuffer(data, dtype="<i2").astype(np.float32).reshape(-1, self.in_channels)
+        if self.in_channels != self.out_channels:
+            mono = samples.mean(axis=1, keepdims=True)
+            samples = mono if self.out_channels == 1 else np.repeat(mono, self.out_channels, axis=1)
+        if self.ratio != 1:
+            samples = self.resample(samples)
+        if self.factor != 1:
+            samples = samples * self.factor
+        return self.encode(samples)
+
+    def resample(self, samples):
+        # linear interpolation, the last input frame is carried over to the next chunk
+        buf = samples if self.tail is None else np.concatenate([self.tail, samples])
+        size = buf.shape[0]
+        count = max(0, int(np.ceil((size - 1 - self.pos) / self.ratio)))
+        positions = self.pos + np.arange(count) * self.ratio
+        index = np.arange(size)
+        out = np.empty((count, buf.shape[1]), dtype=np.float32)
+        for channel in range(buf.shape[1]):
+            out[:, channel] = np.interp(positions, index, buf[:, channel])
+        next_pos = self.pos + count * self.ratio
+        keep = min(int(next_pos), size - 1) if size else 0
+        self.tail = buf[keep:]
+        self.pos = next_pos - keep
+        return out
+
+    def encode(self, samples) -> bytes:
+        samples = np.clip(samples, -32768, 32767)
+        if self.out_width == 1:
+            return (samples / 256 + 128).astype(np.uint8).tobytes()
+        if self.out_width == 4:
+            return (samples.astype(np.int32) << 16).astype("<i4").tobytes()
+        return samples.astype("<i2").tobytes()
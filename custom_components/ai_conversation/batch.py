@@ -0,0 +1,186 @@
+import time
+import aiohttp
+from datetime import timedelta
+from urllib.parse import urlparse
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.util import ulid
+
+from .const import *
+from .schemas import ChatCompletionsResult
+from .scheduler import PRIORITY_BATCH
+
+STORAGE_VERSION = 1
+BATCH_POLL_INTERVAL = timedelta(seconds=60)
+BATCH_MAX_JOBS = 20
+BATCH_DONE_STATUSES = ("completed", "failed", "expired", "cancelled")
+EVENT_BATCH_DONE = f"{DOMAIN}_batch_done"
+
+
+class BatchManager:
+    """Chat completion jobs submitted through the provider's files + batches endpoints."""
+
+    def __init__(self, entry):
+        self.entry = entry
+        self.hass: HomeAssistant = entry.hass
+        self.store = Store(self.hass, STORAGE_VERSION, f"{DOMAIN}.batches_{entry.id}")
+        self.jobs: dict[str, dict] = {}
+        self._unsub = None
+
+    async def async_load(self):
+        self.jobs = await self.store.async_load() or {}
+        self.entry.entry.async_on_unload(self.cancel_poll)
+        self.schedule_poll()
+
+    @staticmethod
+    async def async_remove_store(hass: HomeAssistant, entry_id):
+        await Store(hass, STORAGE_VERSION, f"{DOMAIN}.batches_{entry_id}").async_remove()
+
+    def save(self):
+        while len(self.jobs) > BATCH_MAX_JOBS:
+            done = [job_id for job_id, job in self.jobs.items() if job["status"] in BATCH_DONE_STATUSES]
+            if not done:
+                break
+            self.jobs.pop(done[0])
+        self.store.async_delay_save(lambda: self.jobs, 1)
+
+    @property
+    def pending(self):
+        return [job for job in self.jobs.values() if job["status"] not in BATCH_DONE_STATUSES]
+
+    def schedule_poll(self):
+        if self.pending and not self._unsub:
+            self._unsub = async_track_time_interval(
+                self.hass, self._async_poll, BATCH_POLL_INTERVAL, name=f"{DOMAIN}_batches_{self.entry.id}",
+            )
+
+    @callback
+    def cancel_poll(self):
+        if self._unsub:
+            self._unsub()
+            self._unsub = None
+
+    @property
+    def endpoint(self):
+        path = urlparse(self.entry.get_config(CONF_BASE)).path.rstrip("/")
+        return f"{path}/chat/completions"
+
+    async def async_create(self, entity, requests: list, completion_window="24h"):
+        """Upload the requests as JSONL and create a batch, requests are prompts or lists of messages."""
+        lines = []
+        invalid = []
+        for idx, item in enumerate(requests):
+            if isinstance(item, dict) and "messages" not in item:
+                item = {"messages": [{"role": "user", "content": str(item.get("prompt") or "")}], **item}
+            if not isinstance(item, dict):
+                item = {"messages": [{"role": "user", "content": str(item)}]}
+            custom_id = str(item.get("custom_id") or f"request-{idx}")
+            messages = item["messages"]
+            if not isinstance(messages, list) or not messages or not all(isinstance(msg, dict) for msg in messages):
+                # reported in the job instead of failing the whole batch
+                invalid.append(custom_id)
+                continue
+            messages = list(messages)
+            if (prompt := entity.subentry.data.get(CONF_PROMPT)) and messages[0].get("role") != "system":
+                messages.insert(0, {"role": "system", "content": prompt})
+            body = {"model": item.get("model") or entity.model, "messages": messages}
+            lines.append(self.entry.codec.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": self.endpoint,
+                "body": body,
+            }))
+        if invalid:
+            LOGGER.warning("Skipped batch requests without messages: %s", invalid)
+        if not lines:
+            raise HomeAssistantError(f"No valid batch requests, invalid: {invalid}" if invalid else "No batch requests")
+
+        # batches and their files belong to the account of the key that created them
+        key = self.entry.keys.pick()
+        form = aiohttp.FormData({"purpose": "batch"})
+        form.add_field("file", b"\n".join(lines), content_type="application/jsonl", filename="batch.jsonl")
+        res = await self.entry.async_post("files", data=form, api_key=key)
+        file = await self.async_json(res)
+        res = await self.entry.async_post("batches", {
+            "input_file_id": file.get("id"),
+            "endpoint": self.endpoint,
+            "completion_window": completion_window,
+        }, api_key=key)
+        batch = await self.async_json(res)
+
+        job_id = ulid.ulid_hex()
+        self.jobs[job_id] = {
+            "id": job_id,
+            "batch_id": batch.get("id"),
+            "entity_id": entity.entity_id,
+            "subentry_id": entity.subentry.subentry_id,
+            "status": batch.get("status") or "validating",
+            "created": time.time(),
+            "requests": len(lines),
+            "invalid": invalid,
+            "api_key": key.name if key else None,
+        }
+        self.save()
+        self.schedule_poll()
+        return self.jobs[job_id]
+
+    @staticmethod
+    async def async_json(res: aiohttp.ClientResponse):
+        data = await res.json(content_type=None)
+        if res.status >= 400 or not isinstance(data, dict) or "error" in data:
+            error = data.get("error") if isinstance(data, dict) else data
+            raise HomeAssistantError(f"Batch API error {res.status}: {error}")
+        return data
+
+    async def _async_poll(self, _now=None):
+        for job in self.pending:
+            try:
+                await self.async_update(job)
+            except Exception as exc:
+                LOGGER.warning("Failed to update batch %s: %s", job.get("batch_id"), exc)
+        if not self.pending:
+            self.cancel_poll()
+
+    async def async_update(self, job: dict):
+        res = await self.entry.async_get(
+            f"batches/{job['batch_id']}", priority=PRIORITY_BATCH, api_key=self.entry.keys.get(job.get("api_key")),
+        )
+        batch = await self.async_json(res)
+        status = batch.get("status") or job["status"]
+        job["request_counts"] = batch.get("request_counts")
+        if status not in BATCH_DONE_STATUSES:
+            job["status"] = status
+            self.save()
+            return
+        if file_id := batch.get("output_file_id"):
+            # stays pending and is polled again if the download fails
+            job["results"] = await self.async_results(job, file_id)
+        job["status"] = status
+        if errors := batch.get("errors"):
+            job["error"] = errors
+        job["finished"] = time.time()
+        self.save()
+        self.hass.bus.async_fire(EVENT_BATCH_DONE, job)
+
+    async def async_results(self, job: dict, file_id):
+        res = await self.entry.async_get(
+            f"files/{file_id}/content", priority=PRIORITY_BATCH, api_key=self.entry.keys.get(job.get("api_key")),
+        )
+        res.raise_for_status()
+        results = []
+        subentry = self.entry.subentries.get(job.get("subentry_id"))
+        for line in (await res.read()).splitlines():
+            if not line.strip():
+                continue
+            item = self.entry.codec.loads(line)
+            response = item.get("response") or {}
+            result = ChatCompletionsResult(response.get("body"))
+            message = result.message
+            results.append({
+                "custom_id": item.get("custom_id"),
+                "content": message.content if message else None,
+                "error": item.get("error") or result.error,
+            })
+            if subentry:
+                self.entry.usage.async_record(subentry, result.usage.to_dict() if result.usage else None)
+        return results
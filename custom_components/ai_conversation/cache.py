@@ -0,0 +1,255 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+
+from .const import *
+
+STORAGE_VERSION = 1
+SAVE_DELAY = 10
+PHRASE_MEMORY_SIZE = 64
+PHRASE_DISK_SIZE = 1000
+# media is downloaded once more to be hashed, larger or slower media is not cached
+HASH_MAX_BYTES = 20 * 1024 * 1024
+HASH_TIMEOUT = 10
+
+
+class StoreCache:
+    """LRU cache with TTL, persisted via HA storage helpers."""
+
+    def __init__(self, hass: HomeAssistant, key: str, ttl: float = 0, max_size: int = 0):
+        self.hass = hass
+        self.ttl = ttl
+        self.max_size = max_size
+        self.store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{key}")
+        self.items: OrderedDict[str, dict] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._loaded = False
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    async def async_get_instance(cls, hass: HomeAssistant, key: str, **kwargs):
+        domain_data = hass.data.setdefault(DOMAIN, {})
+        caches = domain_data.setdefault("caches", {})
+        if not (this := caches.get(key)):
+            this = caches[key] = cls(hass, key, **kwargs)
+        await this.async_load()
+        return this
+
+    async def async_load(self):
+        if self._loaded:
+            return
+        async with self._lock:
+            if self._loaded:
+                return
+            data = await self.store.async_load() or {}
+            now = time.time()
+            for key, item in sorted(data.get("items", {}).items(), key=lambda x: x[1].get("used", 0)):
+                if self.is_expired(item, now):
+                    continue
+                self.items[key] = item
+            self._loaded = True
+            self.evict()
+
+    def is_expired(self, item: dict, now=None):
+        ttl = item.get("ttl", self.ttl)
+        if not ttl:
+            return False
+        return (now or time.time()) - item.get("time", 0) > ttl
+
+    def get(self, key: str, default=None):
+        item = self.items.get(key)
+        if item is None:
+            self.misses += 1
+            return default
+        if self.is_expired(item):
+            self.items.pop(key, None)
+            self.misses += 1
+            self.save()
+            return default
+        self.hits += 1
+        item["used"] = time.time()
+        self.items.move_to_end(key)
+        self.save()
+        return item.get("value")
+
+    def set(self, key: str, value, ttl=None):
+        now = time.time()
+        item = {"value": value, "time": now, "used": now}
+        if ttl is not None:
+            item["ttl"] = ttl
+        self.items[key] = item
+        self.items.move_to_end(key)
+        self.evict()
+        self.save()
+
+    def pop(self, key: str, default=None):
+        item = self.items.pop(key, None)
+        if item is None:
+            return default
+        self.save()
+        return item.get("value")
+
+    def evict(self):
+        if not self.max_size:
+            return
+        while len(self.items) > self.max_size:
+            self.items.popitem(last=False)
+
+    def save(self):
+        self.store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self):
+        return {"items": dict(self.items)}
+
+    @property
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self.items),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0,
+        }
+
+
+class PhraseCache:
+    """Audio of short phrases, an in-memory LRU in front of an LRU directory on disk."""
+
+    def __init__(self, hass: HomeAssistant, path: str, memory_size=PHRASE_MEMORY_SIZE, disk_size=PHRASE_DISK_SIZE):
+        self.hass = hass
+        self.path = path
+        self.memory_size = memory_size
+        self.disk_size = disk_size
+        self.memory: OrderedDict[str, bytes] = OrderedDict()
+        self.disk: OrderedDict[str, None] | None = None
+        self.hits = {"memory": 0, "disk": 0}
+        self.misses = 0
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def get_instance(cls, hass: HomeAssistant):
+        domain_data = hass.data.setdefault(DOMAIN, {})
+        if not (this := domain_data.get("phrase_cache")):
+            this = domain_data["phrase_cache"] = cls(hass, hass.config.path("tts", f"{DOMAIN}_phrases"))
+        return this
+
+    def _file(self, key):
+        return os.path.join(self.path, f"{key}.bin")
+
+    def _scan(self):
+        os.makedirs(self.path, exist_ok=True)
+        files = [entry for entry in os.scandir(self.path) if entry.name.endswith(".bin")]
+        files.sort(key=lambda entry: entry.stat().st_mtime)
+        return [entry.name[:-4] for entry in files]
+
+    async def async_load_index(self):
+        if self.disk is not None:
+            return
+        async with self._lock:
+            if self.disk is None:
+                keys = await self.hass.async_add_executor_job(self._scan)
+                self.disk = OrderedDict.fromkeys(keys)
+
+    def _read(self, key):
+        file = self._file(key)
+        with open(file, "rb") as f:
+            audio = f.read()
+        # mtime keeps the lru order across restarts
+        os.utime(file)
+        return audio
+
+    def _write(self, key, audio, evicted):
+        with open(self._file(key), "wb") as f:
+            f.write(audio)
+        for old in evicted:
+            try:
+                os.remove(self._file(old))
+            except FileNotFoundError:
+                pass
+
+    async def async_get(self, key) -> bytes | None:
+        if (audio := self.memory.get(key)) is not None:
+            self.memory.move_to_end(key)
+            self.hits["memory"] += 1
+            return audio
+        await self.async_load_index()
+        if key in self.disk:
+            try:
+                audio = await self.hass.async_add_executor_job(self._read, key)
+            except OSError:
+                self.disk.pop(key, None)
+            else:
+                self.disk.move_to_end(key)
+                self.hits["disk"] += 1
+                self.set_memory(key, audio)
+                return audio
+        self.misses += 1
+        return None
+
+    def set_memory(self, key, audio: bytes):
+        self.memory[key] = audio
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
+
+    async def async_set(self, key, audio: bytes):
+        self.set_memory(key, audio)
+        await self.async_load_index()
+        self.disk[key] = None
+        self.disk.move_to_end(key)
+        evicted = []
+        while len(self.disk) > self.disk_size:
+            evicted.append(self.disk.popitem(last=False)[0])
+        try:
+            await self.hass.async_add_executor_job(self._write, key, audio, evicted)
+        except OSError as exc:
+            LOGGER.info("Failed to cache phrase audio: %s", exc)
+            self.disk.pop(key, None)
+
+    @property
+    def stats(self):
+        hits = sum(self.hits.values())
+        total = hits + self.misses
+        return {
+            "memory_size": len(self.memory),
+            "disk_size": len(self.disk or ()),
+            "memory_hits": self.hits["memory"],
+            "disk_hits": self.hits["disk"],
+            "misses": self.misses,
+            "hit_rate": round(hits / total, 4) if total else 0,
+        }
+
+
+def hash_key(*parts):
+    raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+async def async_hash_url(hass: HomeAssistant, url: str, chunk_size=65536):
+    """Hash the content of media, falling back to the url itself, None if it is too large or too slow."""
+    if not url.startswith("http"):
+        return hashlib.sha256(url.encode()).hexdigest()
+    sha = hashlib.sha256()
+    size = 0
+    session = async_get_clientsession(hass)
+    try:
+        async with asyncio.timeout(HASH_TIMEOUT), session.get(url) as res:
+            res.raise_for_status()
+            if (res.content_length or 0) > HASH_MAX_BYTES:
+                return None
+            async for chunk in res.content.iter_chunked(chunk_size):
+                size += len(chunk)
+                if size > HASH_MAX_BYTES:
+                    return None
+                sha.update(chunk)
+    except TimeoutError:
+        LOGGER.info("Media took longer than %ss to hash, not cached: %s", HASH_TIMEOUT, url)
+        return None
+    return sha.hexdigest()
@@ -0,0 +1,170 @@
+import asyncio
+import time
+import aiohttp
+
+from .const import *
+from .schemas import Dict, ChatMessage
+from .scheduler import PRIORITY_BATCH
+
+CAPABILITIES_TTL = 86400 * 7
+PROBE_TIMEOUT = aiohttp.ClientTimeout(total=30)
+# only these mean the provider rejected the feature, anything else may be transient
+REJECTED_STATUSES = (400, 422)
+# 1x1 transparent png
+PROBE_IMAGE = (
+    "data:image/png;base64,"
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=="
+)
+PROBE_TOOL = Dict(
+    type="function",
+    function=Dict(
+        name="get_time",
+        description="Get the current time of a city",
+        parameters={
+            "type": "object",
+            "properties": {"city": {"type": "string"}},
+            "required": ["city"],
+        },
+    ),
+)
+PROBE_SCHEMA = Dict(
+    name="probe",
+    strict=True,
+    schema={
+        "type": "object",
+        "properties": {"ok": {"type": "boolean"}},
+        "required": ["ok"],
+        "additionalProperties": False,
+    },
+)
+
+
+class ModelCapabilities(Dict):
+    """Probed features of a model, `None` means unknown."""
+
+    FIELDS = (
+        "streaming", "json_schema", "json_object", "tools", "parallel_tool_calls",
+        "vision", "reasoning_content",
+    )
+
+    @property
+    def probed(self):
+        return self.get("probed_at") is not None
+
+    def response_format(self, schema: Dict):
+        """Pick the cheapest structured output mode, `None` if unknown."""
+        if self.json_schema:
+            return Dict(type="json_schema", json_schema=schema), False
+        if self.json_object:
+            return Dict(type="json_object"), True
+        if self.probed:
+            return None, True
+        return None, None
+
+
+class CapabilityProber:
+    """Detect features by sending tiny requests, `entry` needs an `async_post` method."""
+
+    def __init__(self, entry, model: str):
+        self.entry = entry
+        self.model = model
+        self.caps = ModelCapabilities()
+        self.partial = False
+
+    async def async_request(self, messages, **kwargs):
+        data = Dict(model=self.model, messages=messages, max_tokens=64, **kwargs)
+        try:
+            res = await self.entry.async_post(
+                "chat/completions", data, timeout=PROBE_TIMEOUT, priority=PRIORITY_BATCH,
+            )
+        except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+            LOGGER.info("Probe %s failed: %s", self.model, exc)
+            return None, None
+        async with res:
+            if res.status != 200:
+                LOGGER.debug("Probe %s rejected: %s", self.model, [kwargs.keys(), res.status])
+                return res, None
+            if data.get("stream"):
+                return res, await res.content.read(1)
+            try:
+                result = await res.json(content_type=None)
+            except ValueError:
+                return res, None
+        message = ((result.get("choices") or [{}])[0] or {}).get("message") or {}
+        if "reasoning_content" in message:
+            self.caps.reasoning_content = True
+        return res, message
+
+    def verdict(self, res, supported):
+        """True/False when the provider answered or rejected the request, None (unknown) otherwise."""
+        if res is not None and res.status == 200:
+            return bool(supported)
+        if res is not None and res.status in REJECTED_STATUSES:
+            return False
+        self.partial = True
+        return None
+
+    async def async_probe(self):
+        hello = [ChatMessage("Reply with `ok`.")]
+
+        res, message = await self.async_request(hello)
+        if message is None:
+            return None
+
+        res, chunk = await self.async_request(hello, stream=True)
+        self.caps.streaming = self.verdict(
+            res, res is not None and chunk and res.content_type == "text/event-stream"
+        )
+
+        res, message = await self.async_request(
+            [ChatMessage('Reply with JSON: {"ok": true}')],
+            response_format=Dict(type="json_schema", json_schema=PROBE_SCHEMA),
+        )
+        self.caps.json_schema = self.verdict(res, self.is_json(message))
+        res, message = await self.async_request(
+            [ChatMessage('Reply with JSON: {"ok": true}')],
+            response_format=Dict(type="json_object"),
+        )
+        self.caps.json_object = self.verdict(res, self.is_json(message))
+
+        res, message = await self.async_request(
+            [ChatMessage("What time is it in Paris and in Tokyo?")],
+            tools=[PROBE_TOOL],
+        )
+        self.caps.tools = self.verdict(res, self.has_tool_call(message))
+        if self.caps.tools:
+            res, message = await self.async_request(
+                [ChatMessage("What time is it in Paris and in Tokyo?")],
+                tools=[PROBE_TOOL],
+                parallel_tool_calls=True,
+            )
+            self.caps.parallel_tool_calls = self.verdict(res, self.has_tool_call(message, 2))
+
+        res, message = await self.async_request([ChatMessage([
+            {"type": "text", "text": "Reply with `ok`."},
+            {"type": "image_url", "image_url": {"url": PROBE_IMAGE}},
+        ])])
+        self.caps.vision = self.verdict(res, message is not None)
+
+        if self.caps.reasoning_content is None:
+            self.caps.reasoning_content = False
+        if self.partial:
+            # unknown fields keep the old heuristics and are probed again on the next setup
+            LOGGER.info("Partially probed capabilities of %s: %s", self.model, self.caps)
+            return self.caps
+        self.caps.probed_at = int(time.time())
+        LOGGER.info("Probed capabilities of %s: %s", self.model, self.caps)
+        return self.caps
+
+    @staticmethod
+    def has_tool_call(message, count=1):
+        calls = (message or {}).get("tool_calls") or []
+        name = PROBE_TOOL.function.name
+        return sum(1 for call in calls if (call.get("function") or {}).get("name") == name) >= count
+
+    @staticmethod
+    def is_json(message):
+        if not message or not isinstance(message.get("content"), str):
+            return False
+        content = message["content"].strip()
+        return content.startswith("{") and content.endswith("}")
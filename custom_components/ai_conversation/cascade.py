@@ -0,0 +1,87 @@
+import re
+
+from .const import *
+
+ESCALATE_SIGNALS = ("invalid_tool_call", "tool_error", "empty", "refusal", "iterations")
+DEFAULT_FAST_ITERATIONS = 3
+REFUSAL_PATTERN = re.compile(
+    r"^\s*(i'?m sorry|sorry, i|i (am|'m) (unable|not able)|i can(no|')t (help|do|assist|control)"
+    r"|抱歉.{0,12}(无法|不能)|我(无法|不能)(帮|完成|执行|控制))",
+    re.IGNORECASE,
+)
+
+
+class ModelCascade:
+    """One conversation turn on a fast model, escalating to the configured model on signs of failure."""
+
+    def __init__(self, options: dict, stats: dict):
+        self.fast_model = options.get(CONF_FAST_MODEL)
+        self.signals = set(options.get(CONF_ESCALATE_ON) or ESCALATE_SIGNALS)
+        self.max_iterations = int(options.get(CONF_FAST_ITERATIONS) or DEFAULT_FAST_ITERATIONS)
+        self.stats = stats
+        self.escalated = None
+        self.iterations = 0
+        stats["turns"] = stats.get("turns", 0) + 1
+
+    @property
+    def active(self):
+        return self.escalated is None
+
+    @property
+    def tier(self):
+        return "fast" if self.active else "escalated"
+
+    @staticmethod
+    def supports(caps, data) -> bool:
+        """Whether the probed features of the fast model cover a request built for the main model."""
+        if data.get("tools") and caps.tools is False:
+            return False
+        if (response_format := data.get("response_format")) and caps.get(response_format.get("type")) is False:
+            return False
+        return True
+
+    def check_error(self, err) -> str | None:
+        """Api errors of the fast model always escalate, the main model may accept the same request."""
+        return "api_error" if self.active else None
+
+    def check_response(self, message, tool_names: set) -> str | None:
+        """Signal of a bad response, checked before it is added to the chat log."""
+        if not self.active:
+            return None
+        if message is None or not (message.content or message.tool_calls):
+            return self.signal("empty")
+        for call in message.tool_calls:
+            if call.name not in tool_names:
+                return self.signal("invalid_tool_call")
+            try:
+                call.args
+            except ValueError:
+                return self.signal("invalid_tool_call")
+        if message.refusal or (
+            not message.tool_calls and REFUSAL_PATTERN.match(str(message.content or ""))
+        ):
+            return self.signal("refusal")
+        return None
+
+    def check_iteration(self, contents: list) -> str | None:
+        """Signal after the tools of an iteration were run."""
+        if not self.active:
+            return None
+        self.iterations += 1
+        for content in contents:
+            result = getattr(content, "tool_result", None)
+            if content.role == "tool_result" and isinstance(result, dict) and "error" in result:
+                if reason := self.signal("tool_error"):
+                    return reason
+        if self.iterations >= self.max_iterations:
+            return self.signal("iterations")
+        return None
+
+    def signal(self, reason):
+        return reason if reason in self.signals else None
+
+    def escalate(self, reason):
+        self.escalated = reason
+        self.stats["escalations"] = self.stats.get("escalations", 0) + 1
+        reasons = self.stats.setdefault("reasons", {})
+        reasons[reason] = reasons.get(reason, 0) + 1
@@ -0,0 +1,82 @@
+import asyncio
+import time
+from aiohttp import ClientSession, ClientTimeout, hdrs, web_exceptions
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+
+from .const import *
+from .cache import StoreCache, hash_key
+from .keypool import split_keys
+
+CATALOG_TTL = 3600
+CATALOG_SIZE = 50
+REFRESHING: dict[str, asyncio.Task] = {}
+
+
+class ModelCatalog:
+    """Models of a provider, cached in HA storage and revalidated in the background when stale."""
+
+    def __init__(self, hass: HomeAssistant, data: dict, session: ClientSession | None = None):
+        self.hass = hass
+        self.base = (data.get(CONF_BASE) or "").rstrip("/")
+        # any key of a pool lists the same models
+        self.api_key = next(iter(split_keys(data.get(CONF_API_KEY))), "")
+        self.session = session
+        self.timeout = float(data.get(CONF_MODELS_TIMEOUT) or DEFAULT_TIMEOUTS["models"])
+        self.key = hash_key(self.base, self.api_key)
+
+    async def async_get_cache(self):
+        return await StoreCache.async_get_instance(self.hass, "models", max_size=CATALOG_SIZE)
+
+    async def async_get(self, refresh=False) -> list[dict]:
+        """Cached models at once, the first call or `refresh` waits for the provider."""
+        cache = await self.async_get_cache()
+        cached = cache.get(self.key)
+        if cached is None or refresh:
+            return await self.async_refresh()
+        if time.time() - cached.get("time", 0) > CATALOG_TTL:
+            self.hass.async_create_background_task(self.async_revalidate(), f"{DOMAIN}_models_{self.key[:8]}")
+        return cached.get("models") or []
+
+    async def async_revalidate(self):
+        try:
+            await self.async_refresh()
+        except Exception as exc:
+            LOGGER.debug("Failed to refresh models of %s: %s", self.base, exc)
+
+    async def async_refresh(self) -> list[dict]:
+        # concurrent flows share one request
+        if (task := REFRESHING.get(self.key)) is None:
+            task = REFRESHING[self.key] = self.hass.async_create_task(self._async_fetch_and_store())
+            task.add_done_callback(lambda _: REFRESHING.pop(self.key, None))
+        return await asyncio.shield(task)
+
+    async def _async_fetch_and_store(self):
+        models = await self.async_fetch()
+        cache = await self.async_get_cache()
+        if not models and (cached := cache.get(self.key)) and cached.get("models"):
+            # an empty list is more likely a provider hiccup than all models gone
+            LOGGER.info("Got no models from %s, keeping the cached list", self.base)
+            return cached["models"]
+        cache.set(self.key, {"models": models, "time": time.time()})
+        return models
+
+    async def async_fetch(self) -> list[dict]:
+        if self.session:
+            session, url = self.session, "models"
+        else:
+            session, url = async_get_clientsession(self.hass), f"{self.base}/models"
+        headers = {hdrs.AUTHORIZATION: f"Bearer {self.api_key}"}
+        timeout = ClientTimeout(total=self.timeout)
+        async with session.get(url, timeout=timeout, headers=headers) as res:
+            try:
+                resp = await res.json(content_type=None)
+            except ValueError:
+                resp = await res.text()
+        if res.status >= 400 or (isinstance(resp, dict) and resp.get("error")):
+            error = resp.get("error", resp) if isinstance(resp, dict) else resp
+            text = error.get("message") if isinstance(error, dict) else None
+            if res.status == 401:
+                raise web_exceptions.HTTPUnauthorized(body=text or str(error))
+            raise HomeAssistantError(f"Failed to get models ({res.status}): {text or str(error)[:200]}")
+        LOGGER.info("Got models: %s", [self.base, resp, res])
+        return (resp.get("data") if isinstance(resp, dict) else None) or []
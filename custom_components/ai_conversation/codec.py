@@ -0,0 +1,68 @@
+import orjson
+from collections import OrderedDict
+
+from .const import *
+
+CODEC_CACHE_SIZE = 512
+# same as json.dumps, int keys of tool schemas are stringified
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+class WireCodec:
+    """orjson request encoder splicing cached bytes of static segments (tool definitions)."""
+
+    def __init__(self, max_size=CODEC_CACHE_SIZE):
+        self.max_size = max_size
+        self.objects: OrderedDict[bytes, Any] = OrderedDict()
+        self.encoded: dict[int, bytes] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def intern(self, obj):
+        """Return the cached object encoding the same as obj, its bytes are reused by `dumps`.
+
+        Keyed by the encoding itself, so any change of a definition is a new entry.
+        """
+        key = orjson.dumps(obj, option=ORJSON_OPTIONS)
+        if (cached := self.objects.get(key)) is not None:
+            self.hits += 1
+            self.objects.move_to_end(key)
+            return cached
+        self.misses += 1
+        self.objects[key] = obj
+        self.encoded[id(obj)] = key
+        while len(self.objects) > self.max_size:
+            old = self.objects.popitem(last=False)[1]
+            self.encoded.pop(id(old), None)
+        return obj
+
+    def encode(self, value) -> bytes:
+        if (encoded := self.encoded.get(id(value))) is not None:
+            return encoded
+        if isinstance(value, list):
+            return b"[" + b",".join(map(self.encode_item, value)) + b"]"
+        return orjson.dumps(value, option=ORJSON_OPTIONS)
+
+    def encode_item(self, value) -> bytes:
+        if (encoded := self.encoded.get(id(value))) is not None:
+            return encoded
+        return orjson.dumps(value, option=ORJSON_OPTIONS)
+
+    def dumps(self, data: dict) -> bytes:
+        """Encode the request body, top level values and list items may be cached fragments."""
+        return b"{" + b",".join(
+            orjson.dumps(str(key)) + b":" + self.encode(value)
+            for key, value in data.items()
+        ) + b"}"
+
+    @staticmethod
+    def loads(raw: bytes | str):
+        return orjson.loads(raw)
+
+    @property
+    def stats(self):
+        return {
+            "size": len(self.objects),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -7,10 +7,13 @@ from homeassistant.helpers.selector import (
     SelectSelectorConfig,
     TemplateSelector,
     ObjectSelector,
+    EntitySelector,
+    EntitySelectorConfig,
 )
-from homeassistant.helpers.aiohttp_client import async_create_clientsession
 
 from .const import *
+from .catalog import ModelCatalog
+from .cascade import ESCALATE_SIGNALS
 
 OPENAI_API = "https://api.openai.com/v1"
 ZHI_PU_API = "https://open.bigmodel.cn/api/paas/v4"
@@ -38,7 +41,7 @@ OPEN_APIS = {
 }
 
 
-async def get_models(hass: HomeAssistant, data: dict):
+async def get_models(hass: HomeAssistant, data: dict, refresh=False, entry: ConfigEntry | None = None):
     """Validate the user input allows us to connect."""
     url = data.get(CONF_BASE, "")
     key = data.get(CONF_API_KEY, "")
@@ -47,17 +50,12 @@ async def get_models(hass: HomeAssistant, data: dict):
         lnk = "https://www.bigmodel.cn/invite?icode=EwilDKx13%2FhyODIyL%2BKabHHEaazDlIZGj9HxftzTbt4%3D"
         raise ValueError(f"智谱AI为用户提供了免费的大模型，[立即注册]({lnk})免费使用！")
 
-    session = async_create_clientsession(hass, base_url=f"{url.rstrip('/')}/")
-    res = await session.get("models", timeout=10.0, headers={
-        hdrs.AUTHORIZATION: f"Bearer {key}",
-    })
-    resp = await res.json()
-    if res.status == 401:
-        error = resp.get("error", resp) if isinstance(resp, dict) else resp
-        text = error.get("message") or str(error)
-        raise web_exceptions.HTTPUnauthorized(body=text)
-    LOGGER.info("Got models: %s", [data, resp, res])
-    return resp.get("data") or []
+    from . import HassEntry
+    if entry and (this := HassEntry.ALL.get(entry.entry_id)):
+        catalog = this.catalog
+    else:
+        catalog = ModelCatalog(hass, data)
+    return await catalog.async_get(refresh=refresh)
 
 class HasAttrs:
     attrs = None
@@ -99,6 +97,13 @@ class BasicFlow(config_entries.ConfigEntryBaseFlow, HasAttrs):
         schema = {
             vol.Required(CONF_BASE): str,
             vol.Optional(CONF_API_KEY): str,
+            vol.Optional(CONF_RPM_LIMIT): vol.All(vol.Coerce(int), vol.Range(min=0)),
+            vol.Optional(CONF_TPM_LIMIT): vol.All(vol.Coerce(int), vol.Range(min=0)),
+            vol.Optional(CONF_TRACE_FILE): str,
+            vol.Optional(CONF_WARMUP_CONNECTIONS): vol.All(vol.Coerce(int), vol.Range(min=0, max=10)),
+            vol.Optional(CONF_KEEPALIVE_INTERVAL): vol.All(vol.Coerce(int), vol.Range(min=0)),
+            vol.Optional(CONF_KEEPALIVE_BUDGET): vol.All(vol.Coerce(int), vol.Range(min=0)),
+            vol.Optional(CONF_MODELS_TIMEOUT): vol.All(vol.Coerce(float), vol.Range(min=1)),
         }
         errors = {}
 
@@ -106,9 +111,11 @@ class BasicFlow(config_entries.ConfigEntryBaseFlow, HasAttrs):
             base = base.replace("/chat/completions", "")
             user_input[CONF_BASE] = base
             try:
-                await get_models(self.hass, user_input)
+                await get_models(self.hass, user_input, refresh=True)
             except client_exceptions.ClientConnectionError:
                 errors["base"] = "cannot_connect"
+            except TimeoutError:
+                errors["base"] = "timeout_connect"
             except web_exceptions.HTTPUnauthorized as exc:
                 errors["base"] = "invalid_auth"
                 self.tip = f'🔐 {exc.text or exc}'
@@ -177,9 +184,9 @@ class ConversationFlowHandler(config_entries.ConfigSubentryFlow, HasAttrs):
             sub.data[CONF_MODEL]
             for sub in entry.subentries.values()
         ]
-        models = SERVICES.get(base, {}).get("models", [])
+        models = list(SERVICES.get(base, {}).get("models", []))
         try:
-            api_models = await get_models(self.hass, dict(entry.data))
+            api_models = await get_models(self.hass, dict(entry.data), entry=entry)
             for item in api_models:
                 m = item.get("id")
                 if m and m not in models:
@@ -230,6 +237,24 @@ class ConversationFlowHandler(config_entries.ConfigSubentryFlow, HasAttrs):
             vol.Optional(CONF_PROMPT, default=""): TemplateSelector(),
             vol.Optional(CONF_LLM_HASS_API, default=[]):
                 SelectSelector(SelectSelectorConfig(options=hass_apis, multiple=True)),
+            vol.Optional(CONF_LOCAL_INTENTS): bool,
+            vol.Optional(CONF_FAST_MODEL): str,
+            vol.Optional(CONF_ESCALATE_ON, default=list(ESCALATE_SIGNALS)): SelectSelector(SelectSelectorConfig(
+                options=list(ESCALATE_SIGNALS), multiple=True, translation_key=CONF_ESCALATE_ON,
+            )),
+            vol.Optional(CONF_FAST_ITERATIONS): vol.All(vol.Coerce(int), vol.Range(min=1)),
+            vol.Optional(CONF_TIMEOUT): vol.All(vol.Coerce(float), vol.Range(min=1)),
+            vol.Optional(CONF_TURN_TIMEOUT): vol.All(vol.Coerce(float), vol.Range(min=1)),
+            vol.Optional(CONF_TOOL_TOP_K): vol.All(vol.Coerce(int), vol.Range(min=0)),
+            vol.Optional(CONF_PINNED_TOOLS, default=[]):
+                SelectSelector(SelectSelectorConfig(options=[], multiple=True, custom_value=True)),
+            vol.Optional(CONF_ENTITY_TOP_K): vol.All(vol.Coerce(int), vol.Range(min=0)),
+            vol.Optional(CONF_PINNED_ENTITIES, default=[]): EntitySelector(EntitySelectorConfig(multiple=True)),
+            vol.Optional(CONF_ENTITY_VECTORS): bool,
+            vol.Optional(CONF_CONTEXT_TOKENS): vol.All(vol.Coerce(int), vol.Range(min=0)),
+            vol.Optional(CONF_SUMMARY_MODEL): str,
+            vol.Optional(CONF_PROMPT_COST): vol.Coerce(float),
+            vol.Optional(CONF_COMPLETION_COST): vol.Coerce(float),
         }
         return self.async_show_form(
             step_id="init",
@@ -268,7 +293,12 @@ class TtsFlowHandler(config_entries.ConfigSubentryFlow, HasAttrs):
         schema = {
             vol.Required(CONF_MODEL): str,
             vol.Optional("full_input"): bool,
+            vol.Optional(CONF_EAGER_SYNTHESIS): bool,
+            vol.Optional(CONF_PCM): bool,
+            vol.Optional(CONF_PHRASE_CACHE): bool,
+            vol.Optional(CONF_PCM_SAMPLE_RATE): vol.All(vol.Coerce(int), vol.Range(min=8000)),
             vol.Optional("extra_body"): ObjectSelector(),
+            vol.Optional(CONF_TIMEOUT): vol.All(vol.Coerce(float), vol.Range(min=1)),
         }
         return self.async_show_form(
             step_id="init",
@@ -307,6 +337,9 @@ class SttFlowHandler(config_entries.ConfigSubentryFlow, HasAttrs):
         schema = {
             vol.Required(CONF_MODEL): str,
             vol.Optional("extra_body"): ObjectSelector(),
+            vol.Optional(CONF_TIMEOUT): vol.All(vol.Coerce(float), vol.Range(min=1)),
+            vol.Optional(CONF_PROMPT_COST): vol.Coerce(float),
+            vol.Optional(CONF_COMPLETION_COST): vol.Coerce(float),
         }
         return self.async_show_form(
             step_id="init",
@@ -18,11 +18,58 @@ DOMAIN = "ai_conversation"
 LOGGER = logging.getLogger(__package__)
 
 MAX_TOOL_ITERATIONS = 10
+SIGNAL_TURN_PROGRESS = f"{DOMAIN}_turn_progress_{{}}"
+ERROR_TIMEOUT = "timeout"
+DEFAULT_TIMEOUTS = {
+    "chat": 60,
+    "turn": 120,
+    "tts": 30,
+    "stt": 30,
+    "models": 10,
+}
 CONF_CUSTOM = "custom"
 CONF_PROMPT = "prompt"
+CONF_PROMPT_COST = "prompt_cost"
+CONF_COMPLETION_COST = "completion_cost"
+CONF_TRACE_FILE = "trace_file"
+CONF_RPM_LIMIT = "rpm_limit"
+CONF_TPM_LIMIT = "tpm_limit"
+CONF_CONTEXT_TOKENS = "context_tokens"
+CONF_SUMMARY_MODEL = "summary_model"
+CONF_TIMEOUT = "timeout"
+CONF_TURN_TIMEOUT = "turn_timeout"
+CONF_TOOL_TOP_K = "tool_top_k"
+CONF_PINNED_TOOLS = "pinned_tools"
+CONF_ENTITY_TOP_K = "entity_top_k"
+CONF_PINNED_ENTITIES = "pinned_entities"
+CONF_ENTITY_VECTORS = "entity_vectors"
+CONF_LOCAL_INTENTS = "local_intents"
+CONF_FAST_MODEL = "fast_model"
+CONF_ESCALATE_ON = "escalate_on"
+CONF_FAST_ITERATIONS = "fast_iterations"
+CONF_EAGER_SYNTHESIS = "eager_synthesis"
+CONF_PCM = "pcm"
+CONF_PHRASE_CACHE = "phrase_cache"
+CONF_PCM_SAMPLE_RATE = "pcm_sample_rate"
+CONF_WARMUP_CONNECTIONS = "warmup_connections"
+CONF_KEEPALIVE_INTERVAL = "keepalive_interval"
+CONF_KEEPALIVE_BUDGET = "keepalive_budget"
+CONF_MODELS_TIMEOUT = "models_timeout"
+
+DEFAULT_KEEPALIVE_BUDGET = 120
+DEFAULT_PCM_SAMPLE_RATE = 24000
+
+EXPLAIN_CACHE_TTL = 86400
+EXPLAIN_CACHE_SIZE = 500
+EXPLAIN_JOB_CONCURRENCY = 2
+# shared by all transcribe calls of a provider
+TRANSCRIBE_ENTRY_CONCURRENCY = 4
+EXPLAIN_QUEUE_SIZE = 50
+EVENT_EXPLAIN_MEDIA_DONE = f"{DOMAIN}_explain_media_done"
 
 PLATFORMS = (
     Platform.CONVERSATION,
+    Platform.SENSOR,
     Platform.STT,
     Platform.TTS,
 )
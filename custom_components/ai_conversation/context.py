@@ -0,0 +1,126 @@
+import json
+import re
+
+from .const import *
+
+CJK_PATTERN = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uff00-\uffef]")
+MESSAGE_OVERHEAD = 4
+TRUNCATED_TOOL_CHARS = 200
+
+
+def estimate_tokens(value) -> int:
+    """Rough local token estimate, ~4 chars per token and 1 per CJK char."""
+    if value is None:
+        return 0
+    if not isinstance(value, str):
+        value = json.dumps(value, ensure_ascii=False)
+    cjk = len(CJK_PATTERN.findall(value))
+    return cjk + (len(value) - cjk + 3) // 4
+
+
+def estimate_message_tokens(message: dict) -> int:
+    tokens = MESSAGE_OVERHEAD + estimate_tokens(message.get("content"))
+    if tool_calls := message.get("tool_calls"):
+        tokens += estimate_tokens(tool_calls)
+    return tokens
+
+
+class ContextWindow:
+    """Fit chat messages into a token budget by trimming the oldest turns first."""
+
+    def __init__(self, budget: int, reserved: int = 0):
+        self.budget = budget
+        self.reserved = reserved
+        self.dropped: list[dict] = []
+
+    @staticmethod
+    def last_turn_index(messages: list[dict]):
+        for idx in range(len(messages) - 1, -1, -1):
+            if messages[idx].get("role") == "user":
+                return idx
+        return len(messages)
+
+    def total(self, messages: list[dict]):
+        return self.reserved + sum(map(estimate_message_tokens, messages))
+
+    def fit(self, messages: list[dict]) -> list[dict]:
+        """Return trimmed messages, trimmed messages are kept in `self.dropped`."""
+        self.dropped = []
+        if not self.budget or self.total(messages) <= self.budget:
+            return messages
+        messages = list(messages)
+        last_turn = self.last_turn_index(messages)
+
+        # stale tool results are the cheapest to lose
+        self.truncate_tool_results(messages, 0, last_turn)
+        if self.total(messages) <= self.budget:
+            return messages
+
+        # drop whole turns, so tool results never lose their tool calls
+        system = [msg for msg in messages[:last_turn] if msg.get("role") == "system"]
+        history = [msg for msg in messages[:last_turn] if msg.get("role") != "system"]
+        current = messages[last_turn:]
+        while history and self.total(system + history + current) > self.budget:
+            end = 1
+            while end < len(history) and history[end].get("role") != "user":
+                end += 1
+            self.dropped.extend(history[:end])
+            history = history[end:]
+        messages = system + history + current
+        if self.total(messages) > self.budget:
+            # results of earlier tool iterations of this turn, the latest ones are still to be answered
+            start = len(system) + len(history)
+            last_call = max(
+                (idx for idx in range(start, len(messages)) if messages[idx].get("role") == "assistant"),
+                default=start,
+            )
+            self.truncate_tool_results(messages, start, last_call)
+        return messages
+
+    @staticmethod
+    def truncate_tool_results(messages: list[dict], start: int, end: int):
+        for idx in range(start, end):
+            msg = messages[idx]
+            if msg.get("role") != "tool" or len(content := str(msg.get("content") or "")) <= TRUNCATED_TOOL_CHARS:
+                continue
+            messages[idx] = {**msg, "content": content[:TRUNCATED_TOOL_CHARS] + "...(truncated)"}
+
+
+class RollingSummary:
+    """Summary of trimmed messages per conversation, extended as more turns are trimmed."""
+
+    PROMPT = (
+        "Summarize the conversation below in a few sentences for later reference. "
+        "Keep names, entities, decisions and facts the assistant may need, in the conversation's language."
+    )
+
+    def __init__(self, max_size=100):
+        self.max_size = max_size
+        self.summaries: dict[str, tuple[int, str]] = {}
+
+    async def async_update(self, entity, conversation_id, dropped: list[dict], model=None):
+        count, summary = self.summaries.get(conversation_id, (0, ""))
+        if count > len(dropped):
+            count, summary = 0, ""
+        new = dropped[count:]
+        if not new:
+            return summary
+        lines = [f"Previous summary: {summary}"] if summary else []
+        lines.extend(
+            f"{msg.get('role')}: {msg.get('content') or json.dumps(msg.get('tool_calls'), ensure_ascii=False)}"
+            for msg in new
+        )
+        result = await entity.async_chat_completions(
+            [
+                {"role": "system", "content": self.PROMPT},
+                {"role": "user", "content": "\n".join(lines)},
+            ],
+            model=model,
+        )
+        if result.message and result.message.content:
+            summary = str(result.message.content).strip()
+        self.summaries.pop(conversation_id, None)
+        self.summaries[conversation_id] = (len(dropped), summary)
+        while len(self.summaries) > self.max_size:
+            self.summaries.pop(next(iter(self.summaries)))
+        return summary
@@ -5,11 +5,13 @@ from homeassistant.components.conversation import (
     ConversationResult,
     ChatLog,
 )
+from homeassistant.helpers import intent
 from homeassistant.helpers.network import get_url
 from homeassistant.components import media_source
 from homeassistant.components.media_player.browse_media import async_process_play_media_url
 
 from . import HassEntry, BasicEntity
+from .cache import StoreCache, hash_key, async_hash_url
 from .const import *
 from .schemas import *
 
@@ -30,6 +32,7 @@ class ConversationEntity(BasicEntity, BaseEntity):
 
     def on_init(self):
         self._attr_unique_id = self.subentry.subentry_id
+        self.intent_stats = {"local": 0, "llm": 0}
 
     @property
     def supported_languages(self):
@@ -43,6 +46,8 @@ class ConversationEntity(BasicEntity, BaseEntity):
     ) -> ConversationResult:
         """Call the API."""
         options = self.subentry.data
+        if options.get(CONF_LOCAL_INTENTS) and (result := await self.async_handle_local(user_input, chat_log)):
+            return result
         try:
             await chat_log.async_provide_llm_data(
                 user_input.as_llm_context(DOMAIN),
@@ -56,7 +61,33 @@ class ConversationEntity(BasicEntity, BaseEntity):
         await self._async_handle_chat_log(chat_log)
         return conversation.async_get_result_from_chat_log(user_input, chat_log)
 
-    async def async_explain_media(self, prompt='', image=None, video=None, tags=None, **kwargs):
+    async def async_handle_local(self, user_input: ConversationInput, chat_log: ChatLog):
+        """Answer with HA's own sentence triggers and intents, None falls back to the LLM."""
+        timing = self.start_timing("local_intent")
+        response = None
+        if speech := await conversation.async_handle_sentence_triggers(self.hass, user_input):
+            response = intent.IntentResponse(language=user_input.language)
+            response.async_set_speech(speech)
+        elif response := await conversation.async_handle_intents(self.hass, user_input):
+            if response.response_type == intent.IntentResponseType.ERROR:
+                # e.g. unknown device name, the LLM may still make sense of it
+                response = None
+        timing.finish(matched=response is not None)
+        if response is None:
+            self.intent_stats["llm"] += 1
+            return None
+        self.intent_stats["local"] += 1
+        speech = response.speech.get("plain", {}).get("speech", "")
+        chat_log.async_add_assistant_content_without_tools(
+            conversation.AssistantContent(agent_id=user_input.agent_id, content=speech)
+        )
+        return ConversationResult(
+            response=response,
+            conversation_id=chat_log.conversation_id,
+            continue_conversation=False,
+        )
+
+    async def async_explain_media(self, prompt='', image=None, video=None, tags=None, cache_ttl=None, **kwargs):
         url = video or image
         if not url:
             return {'error': 'no url'}
@@ -67,23 +98,59 @@ class ConversationEntity(BasicEntity, BaseEntity):
             url = async_process_play_media_url(self.hass, url)
         if not url.startswith('http') and video:
             return {'error': f'url error: {url}'}
+        caps = self.entry.get_capabilities(self.model)
+        if not video and caps.vision is False:
+            return {'error': f'model {self.model} does not support image input'}
+        cache = cache_key = None
+        if cache_ttl:
+            cache = await StoreCache.async_get_instance(
+                self.hass, "explain_media_cache", ttl=EXPLAIN_CACHE_TTL, max_size=EXPLAIN_CACHE_SIZE,
+            )
+            try:
+                digest = await async_hash_url(self.hass, url)
+            except Exception as exc:
+                LOGGER.info("Failed to hash media %s: %s", url, exc)
+                digest = None
+            if digest:
+                cache_key = hash_key(digest, prompt, tags, self.model, self.hass.config.language)
         internal = get_url(self.hass, prefer_external=False)
         external = get_url(self.hass, prefer_external=True)
         url = url.replace(internal, external)
+        if cache_key and (cached := cache.get(cache_key)):
+            # only the answer is shared, the url is of this call and no tokens were used
+            return {**cached, 'url': url, 'usage': None, 'cached': True}
         if not prompt:
             prompt = 'Analyze and summarize.'
         json_mode = not not tags
+        lang = self.hass.config.language or 'en'
+        kwargs = {}
         if json_mode:
-            prompt += '''
-            Please ensure that the response is in JSON schema:
-            {
-              "message": "string(Summary content, language: $lang)",
-              "tags": ["Only return the matched tags ($tags)"]
-            }
-            '''.strip()
-            tags = '|'.join(tags) if isinstance(tags, list) else str(tags)
-            prompt = prompt.replace('$tags', tags)
-            prompt = prompt.replace('$lang', self.hass.config.language or 'en')
+            tags = list(map(str, tags)) if isinstance(tags, list) else str(tags).split('|')
+            response_format, inline_schema = caps.response_format(Dict(
+                name='explain_media',
+                strict=True,
+                schema={
+                    'type': 'object',
+                    'properties': {
+                        'message': {'type': 'string', 'description': f'Summary content, language: {lang}'},
+                        'tags': {'type': 'array', 'items': {'type': 'string', 'enum': tags}},
+                    },
+                    'required': ['message', 'tags'],
+                    'additionalProperties': False,
+                },
+            ))
+            if response_format:
+                kwargs['response_format'] = response_format
+            if inline_schema is not False:
+                prompt += '''
+                Please ensure that the response is in JSON schema:
+                {
+                  "message": "string(Summary content, language: $lang)",
+                  "tags": ["Only return the matched tags ($tags)"]
+                }
+                '''.strip()
+                prompt = prompt.replace('$tags', '|'.join(tags))
+                prompt = prompt.replace('$lang', lang)
         content = [{'type': 'text', 'text': prompt}]
         if video:
             content.append({'type': 'video_url', 'video_url': {'url': url}})
@@ -94,11 +161,11 @@ class ConversationEntity(BasicEntity, BaseEntity):
         result = await self.async_chat_completions([
             {'role': 'system', 'content': system_prompt},
             {'role': 'user', 'content': content},
-        ])
+        ], **kwargs)
         res = {'url': url}
         tags = res.setdefault('tags', [])
         message = result.message
-        msg = message.content if message else ''
+        msg = (message.content if message else '') or ''
         if json_mode:
             arr = msg.split('```json')
             try:
@@ -111,7 +178,10 @@ class ConversationEntity(BasicEntity, BaseEntity):
                 res['error'] = str(exc)
                 res['result'] = result.to_dict()
         res['message'] = msg
-        if message and 'reasoning_content' in message:
+        if message and message.reasoning_content is not None:
             res['reasoning'] = message.reasoning_content
-        res['usage'] = result.usage
+        res['usage'] = result.usage.to_dict() if result.usage else None
+        if cache_key and 'error' not in res:
+            cache.set(cache_key, {**res}, ttl=cache_ttl)
+        res['cached'] = False
         return res
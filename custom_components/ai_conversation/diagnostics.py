@@ -0,0 +1,47 @@
+from homeassistant.components.diagnostics import async_redact_data
+
+from . import HassEntry
+from .const import *
+
+TO_REDACT = {CONF_API_KEY}
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, config_entry: ConfigEntry):
+    entry = await HassEntry.async_init(hass, config_entry)
+    phrases = hass.data.get(DOMAIN, {}).get("phrase_cache")
+    index = hass.data.get(DOMAIN, {}).get("entity_index")
+    return {
+        "config": async_redact_data(entry.get_config(), TO_REDACT),
+        "capabilities": entry.capabilities,
+        "usage": entry.usage.data,
+        "scheduler": entry.scheduler.stats,
+        "explain_jobs": entry.explain_jobs.stats,
+        "api_keys": entry.keys.stats,
+        "codec": entry.codec.stats,
+        "tool_selection": {
+            entity_id: entity.tool_stats
+            for entity_id, entity in entry.entities.items()
+            if getattr(entity, "tool_stats", {}).get("requests")
+        },
+        "entity_selection": {
+            entity_id: entity.entity_stats
+            for entity_id, entity in entry.entities.items()
+            if getattr(entity, "entity_stats", {}).get("requests")
+        },
+        "local_intents": {
+            entity_id: entity.intent_stats
+            for entity_id, entity in entry.entities.items()
+            if hasattr(entity, "intent_stats")
+        },
+        "cascade": {
+            entity_id: entity.cascade_stats
+            for entity_id, entity in entry.entities.items()
+            if getattr(entity, "cascade_stats", {}).get("turns")
+        },
+        "phrase_cache": phrases.stats if phrases else None,
+        "entity_index": {"entities": len(index.docs), "updates": index.updates} if index else None,
+        "latency": {
+            key: stats.as_dict()
+            for key, stats in entry.latency.items()
+        },
+    }
@@ -0,0 +1,219 @@
+import math
+import re
+import zlib
+from collections import Counter
+from homeassistant.const import EVENT_STATE_CHANGED
+from homeassistant.helpers.importlib import async_import_module
+from homeassistant.helpers import (
+    area_registry as ar,
+    device_registry as dr,
+    entity_registry as er,
+)
+
+from .const import *
+from .tool_select import tokenize
+
+OVERVIEW_PATTERN = re.compile(r"^.*An overview of the areas and the devices in this smart home:[ \t]*$", re.M)
+SPACE_PATTERN = re.compile(r"[\s_]+")
+NAMES_PATTERN = re.compile(r"^[- ] names: (.+)$", re.M)
+NAME_WEIGHT = 3
+AREA_WEIGHT = 2
+VECTOR_DIM = 512
+VECTOR_THRESHOLD = 0.35
+
+# only imported when entity vectors are enabled, False when it is not installed
+np = None
+
+
+async def async_import_numpy(hass: HomeAssistant):
+    global np
+    if np is None:
+        try:
+            np = await async_import_module(hass, "numpy")
+        except ImportError as exc:
+            LOGGER.warning("numpy is not available, entity vectors fall back to keyword matching: %s", exc)
+            np = False
+    return np or None
+
+
+def embed(text):
+    """Local hashed character trigram vector, tolerant to plurals, typos and spacing."""
+    vec = np.zeros(VECTOR_DIM, dtype=np.float32)
+    text = " " + SPACE_PATTERN.sub(" ", str(text or "").lower()) + " "
+    for idx in range(len(text) - 2):
+        vec[zlib.crc32(text[idx:idx + 3].encode()) % VECTOR_DIM] += 1
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+def split_overview(prompt: str):
+    """Split the entity overview of the Assist API prompt into (head, items, tail)."""
+    if not (match := OVERVIEW_PATTERN.search(prompt)):
+        return None
+    lines = prompt[match.end():].split("\n")
+    items, idx = [], 1
+    while idx < len(lines) and lines[idx].startswith(("- ", "  ")):
+        if lines[idx].startswith("- "):
+            items.append([])
+        if items:
+            items[-1].append(lines[idx])
+        idx += 1
+    if not items:
+        return None
+    head = prompt[:match.end()] + "\n"
+    return head, ["\n".join(item) for item in items], "\n".join(lines[idx:])
+
+
+class EntityIndex:
+    """Keyword (and optional vector) index of entity names, aliases and areas, kept up to date from events."""
+
+    def __init__(self, hass: HomeAssistant):
+        self.hass = hass
+        self.docs: dict[str, Counter] = {}
+        self.texts: dict[str, str] = {}
+        self.vectors: dict = {}
+        self.names: dict[str, set] = {}
+        self.entity_names: dict[str, list] = {}
+        self.df = Counter()
+        self.dirty = True
+        self.updates = 0
+        self.unsubs = []
+
+    @classmethod
+    def get_instance(cls, hass: HomeAssistant, config_entry: ConfigEntry):
+        """Shared by all entries, it stops listening with the entry that created it and is built again on demand."""
+        domain_data = hass.data.setdefault(DOMAIN, {})
+        if not (this := domain_data.get("entity_index")):
+            this = domain_data["entity_index"] = cls(hass)
+            this.listen()
+            config_entry.async_on_unload(this.unload)
+        return this
+
+    def listen(self):
+        bus = self.hass.bus
+        self.unsubs = [
+            bus.async_listen(EVENT_STATE_CHANGED, self._state_changed),
+            bus.async_listen(er.EVENT_ENTITY_REGISTRY_UPDATED, self._entity_updated),
+            bus.async_listen(ar.EVENT_AREA_REGISTRY_UPDATED, self._invalidate),
+            bus.async_listen(dr.EVENT_DEVICE_REGISTRY_UPDATED, self._invalidate),
+        ]
+
+    @callback
+    def unload(self):
+        while self.unsubs:
+            self.unsubs.pop()()
+        domain_data = self.hass.data.get(DOMAIN, {})
+        if domain_data.get("entity_index") is self:
+            domain_data.pop("entity_index")
+
+    @callback
+    def _state_changed(self, event):
+        if self.dirty:
+            return
+        old, new = event.data.get("old_state"), event.data.get("new_state")
+        if new is None:
+            self.remove(event.data["entity_id"])
+        elif old is None or old.name != new.name:
+            self.update(new.entity_id)
+
+    @callback
+    def _entity_updated(self, event):
+        if self.dirty:
+            return
+        self.remove(event.data.get("old_entity_id") or event.data["entity_id"])
+        if event.data.get("action") != "remove":
+            self.update(event.data["entity_id"])
+
+    @callback
+    def _invalidate(self, _event=None):
+        self.dirty = True
+
+    def rebuild(self):
+        self.docs, self.texts, self.vectors, self.names, self.entity_names = {}, {}, {}, {}, {}
+        self.df = Counter()
+        for state in self.hass.states.async_all():
+            self.update(state.entity_id)
+        self.dirty = False
+
+    def remove(self, entity_id):
+        if doc := self.docs.pop(entity_id, None):
+            self.df.subtract(doc.keys())
+        self.texts.pop(entity_id, None)
+        self.vectors.pop(entity_id, None)
+        for name in self.entity_names.pop(entity_id, ()):
+            self.names[name].discard(entity_id)
+
+    def update(self, entity_id):
+        self.remove(entity_id)
+        if not (state := self.hass.states.get(entity_id)):
+            return
+        entry = er.async_get(self.hass).async_get(entity_id)
+        names = [state.name, *(alias for alias in (entry.aliases if entry else ()) if isinstance(alias, str))]
+        area_id = entry.area_id if entry else None
+        if entry and not area_id and entry.device_id:
+            device = dr.async_get(self.hass).async_get(entry.device_id)
+            area_id = device.area_id if device else None
+        area = ar.async_get(self.hass).async_get_area(area_id) if area_id else None
+        areas = [area.name, *area.aliases] if area else []
+
+        keys = self.entity_names[entity_id] = [name.strip().lower() for name in names]
+        for key in keys:
+            self.names.setdefault(key, set()).add(entity_id)
+        doc = Counter(tokenize(state.domain))
+        doc.update(tokenize(state.attributes.get("device_class")))
+        for name in names:
+            for word in tokenize(name):
+                doc[word] += NAME_WEIGHT
+        for name in areas:
+            for word in tokenize(name):
+                doc[word] += AREA_WEIGHT
+        self.docs[entity_id] = doc
+        self.df.update(doc.keys())
+        self.texts[entity_id] = " ".join([*names, *areas])
+        self.updates += 1
+
+    def match_name(self, item: str):
+        """Entity ids of an overview item, by its first name."""
+        if not (match := NAMES_PATTERN.search(item)):
+            return set()
+        name = match.group(1).strip().strip("'\"").split(",")[0]
+        return self.names.get(name.strip().lower()) or set()
+
+    def score(self, query: str, entity_ids, vectors=False):
+        words = set(tokenize(query))
+        total = len(self.docs) or 1
+        scores = {}
+        for entity_id in entity_ids:
+            doc = self.docs.get(entity_id) or {}
+            scores[entity_id] = sum(
+                math.log(1 + total / self.df[word]) * math.log(1 + doc[word])
+                for word in words if word in doc
+            )
+        if vectors and entity_ids and np:
+            ids = list(entity_ids)
+            for entity_id in ids:
+                if entity_id not in self.vectors:
+                    self.vectors[entity_id] = embed(self.texts.get(entity_id, entity_id))
+            similarity = np.stack([self.vectors[entity_id] for entity_id in ids]) @ embed(query)
+            for entity_id, value in zip(ids, similarity.tolist()):
+                if value >= VECTOR_THRESHOLD:
+                    scores[entity_id] += value
+        return scores
+
+    def filter_prompt(self, prompt: str, query: str, top_k: int, pinned=None, vectors=False):
+        """Keep only the overview items relevant to the query, None if nothing to filter or nothing matched."""
+        if self.dirty:
+            self.rebuild()
+        if not (parts := split_overview(prompt)):
+            return None
+        head, items, tail = parts
+        item_ids = [self.match_name(item) for item in items]
+        candidates = set().union(*item_ids)
+        scores = self.score(query, candidates, vectors)
+        ranked = sorted((entity_id for entity_id in candidates if scores[entity_id] > 0), key=lambda i: -scores[i])
+        if not ranked:
+            return None
+        keep = set(ranked[:top_k]) | set(pinned or [])
+        # items that could not be mapped to an entity are kept as they are
+        kept = [item for item, ids in zip(items, item_ids) if not ids or ids & keep]
+        return head + "\n".join(kept) + ("\n" + tail if tail else ""), len(items), len(kept)
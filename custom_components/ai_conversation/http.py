@@ -1,25 +1,14 @@
-import json
-import anyio
-
 from aiohttp import web
-from aiohttp_sse import sse_response
-from aiohttp.web_exceptions import HTTPBadRequest, HTTPNotFound
-from anyio.streams.memory import MemoryObjectReceiveStream, MemoryObjectSendStream
-from mcp import types
-from mcp.server import Server
-from collections.abc import Sequence
+from aiohttp.web_exceptions import HTTPNotFound
 
 from homeassistant.components import conversation
 from homeassistant.components.http import KEY_HASS, HomeAssistantView
+from homeassistant.helpers.importlib import async_import_module
 from homeassistant.util import uuid
 
 from .const import *
 
-try:
-    from mcp.shared.message import SessionMessage  # ha>=2025.10,mcp>=1.14.1
-except (ImportError, ModuleNotFoundError):
-    SessionMessage = None
-
+# the MCP stack (mcp, anyio, aiohttp_sse, pydantic models) is imported on the first SSE connection
 _LOGGER = logging.getLogger(__name__)
 MESSAGES_API = f"/{DOMAIN}/messages/{{session_id}}"
 
@@ -40,7 +29,6 @@ class ModelContextProtocolSSEView(HomeAssistantView):
 
     async def get(self, request: web.Request) -> web.StreamResponse:
         hass = request.app[KEY_HASS]
-        sessions = hass.data[DOMAIN].setdefault("mcp_sessions", {})
         session_id = uuid.random_uuid_hex()
 
         agent_id = request.query.get("agent_id")
@@ -59,40 +47,9 @@ class ModelContextProtocolSSEView(HomeAssistantView):
         if not agent_id:
             raise HTTPNotFound(text="Could not find Agent ID")
 
-        read_stream: MemoryObjectReceiveStream[types.JSONRPCMessage | Exception]
-        read_stream_writer: MemoryObjectSendStream[types.JSONRPCMessage | Exception]
-        read_stream_writer, read_stream = anyio.create_memory_object_stream(0)
-
-        write_stream: MemoryObjectSendStream[types.JSONRPCMessage]
-        write_stream_reader: MemoryObjectReceiveStream[types.JSONRPCMessage]
-        write_stream, write_stream_reader = anyio.create_memory_object_stream(0)
-
-        sessions[session_id] = read_stream_writer
-
-        async with sse_response(request) as response:
-            server = await create_server(hass, agent_id)
-            options = await hass.async_add_executor_job(server.create_initialization_options)
-            session_uri = MESSAGES_API.format(session_id=session_id)
-            _LOGGER.debug("Sending SSE endpoint: %s", session_uri)
-            await response.send(session_uri, event="endpoint")
-
-            async def sse_reader() -> None:
-                """Forward MCP server responses to the client."""
-                async for session_message in write_stream_reader:
-                    if SessionMessage is not None and isinstance(session_message, SessionMessage):
-                        message = session_message.message
-                    else:
-                        message = session_message
-                    _LOGGER.debug("Sending SSE message: %s", message)
-                    await response.send(
-                        message.model_dump_json(by_alias=True, exclude_none=True),
-                        event="message",
-                    )
-
-            async with anyio.create_task_group() as tg:
-                tg.start_soon(sse_reader)
-                await server.run(read_stream, write_stream, options)
-                return response
+        mcp_server = await async_import_module(hass, f"{__package__}.mcp_server")
+        session_uri = MESSAGES_API.format(session_id=session_id)
+        return await mcp_server.async_handle_sse(hass, request, agent_id, session_id, session_uri)
 
 
 class ModelContextProtocolMessagesView(HomeAssistantView):
@@ -118,64 +75,6 @@ class ModelContextProtocolMessagesView(HomeAssistantView):
             raise HTTPNotFound(text=f"Could not find session ID '{session_id}'")
 
         json_data = await request.json()
-        try:
-            message = types.JSONRPCMessage.model_validate(json_data)
-        except ValueError as err:
-            _LOGGER.info("Failed to parse message: %s", err)
-            raise HTTPBadRequest(text="Could not parse message") from err
-
-        _LOGGER.debug("Received client message: %s", message)
-        if SessionMessage:
-            message = SessionMessage(message)
-        await read_stream_writer.send(message)
+        mcp_server = await async_import_module(hass, f"{__package__}.mcp_server")
+        await mcp_server.async_handle_message(read_stream_writer, json_data)
         return web.Response(status=200)
-
-
-async def create_server(hass: HomeAssistant, agent_id=None):
-    server = Server(DOMAIN)
-
-    @server.list_tools()  # type: ignore[no-untyped-call, misc]
-    async def list_tools() -> list[types.Tool]:
-        """List available time tools."""
-        return [
-            types.Tool(
-                name="ha_conversation",
-                description="Send conversation request to Home Assistant conversation agent",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "text": {
-                            "type": "string",
-                            "description": "The conversation text to send to Home Assistant",
-                        },
-                    },
-                    "required": ["text"],
-                },
-            )
-        ]
-
-    @server.call_tool()  # type: ignore[no-untyped-call, misc]
-    async def call_tool(name: str, arguments: dict) -> Sequence[types.TextContent]:
-        """Handle calling tools."""
-        result = None
-
-        if name == "ha_conversation":
-            text = arguments["text"]
-            result = await hass.services.async_call(
-                conversation.DOMAIN,
-                conversation.SERVICE_PROCESS,
-                {
-                    "agent_id": agent_id,
-                    "text": text,
-                },
-                blocking=True,
-                return_response=True,
-            )
-
-        if result is None:
-            raise ValueError(f"Unknown tool: {name}")
-        return [
-            types.TextContent(type="text", text=json.dumps(result)),
-        ]
-
-    return server
@@ -10,7 +10,7 @@ from homeassistant.helpers import intent, config_validation as cv
 from homeassistant.helpers.network import get_url
 from homeassistant.components.media_player import browse_media, MediaPlayerEntityFeature
 
-from .const import DOMAIN
+from .const import DOMAIN, CONF_EAGER_SYNTHESIS
 
 
 _LOGGER = logging.getLogger(__name__)
@@ -58,6 +58,7 @@ class AiConvertTextToSound(intent.IntentHandler):
         }
         api = f"/api/tts_proxy/{DOMAIN}/{filename}?{urlencode(params)}"
         url = get_url(hass, prefer_external=True) + api
+        self.async_prefetch(hass, message, params)
 
         response.response_type = intent.IntentResponseType.ACTION_DONE
         response.async_set_speech_slots({
@@ -67,6 +68,19 @@ class AiConvertTextToSound(intent.IntentHandler):
         })
         return response
 
+    @staticmethod
+    def async_prefetch(hass: HomeAssistant, message, params: dict):
+        from . import HassEntry
+        from .tts import async_prefetch_tts
+        entity_id = params["entity_id"] or hass.data.get(DOMAIN, {}).get("tts_entity_id")
+        for entry in HassEntry.ALL.values():
+            if not (entity := entry.entities.get(entity_id)):
+                continue
+            if entity.subentry.data.get(CONF_EAGER_SYNTHESIS):
+                # same options as parsed from the query string by the proxy view
+                async_prefetch_tts(hass, entity_id, message, {"speed": str(params["speed"])})
+            return
+
 
 class AiMediaPlayMediaUrl(intent.IntentHandler):
     intent_type = "AiMediaPlayMediaUrl"
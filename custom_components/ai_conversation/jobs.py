@@ -0,0 +1,98 @@
+import asyncio
+import time
+from collections import OrderedDict
+from homeassistant.core import Context
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.util import ulid
+
+from .const import *
+
+JOBS_KEEP = 50
+SIGNAL_JOBS_UPDATED = f"{DOMAIN}_jobs_updated_{{}}"
+
+
+class JobQueue:
+    """Bounded worker pool for service calls that return a job id at once and fire an event when done."""
+
+    def __init__(self, entry, name: str, event: str, concurrency: int, max_size: int):
+        self.entry = entry
+        self.hass: HomeAssistant = entry.hass
+        self.name = name
+        self.event = event
+        self.concurrency = concurrency
+        self.queue: asyncio.Queue = asyncio.Queue(max_size)
+        self.jobs: OrderedDict[str, dict] = OrderedDict()
+        self.workers: list[asyncio.Task] = []
+        self.running = 0
+        self.counts = {"done": 0, "failed": 0}
+
+    def submit(self, func, context: Context | None = None, **info) -> dict:
+        """Queue `func`, an async callable without arguments, its return value becomes the job result."""
+        if self.queue.full():
+            raise HomeAssistantError(f"Too many {self.name} jobs queued ({self.queue.maxsize})")
+        job = {"job_id": ulid.ulid_hex(), "status": "queued", "created": time.time(), **info}
+        self.jobs[job["job_id"]] = job
+        while len(self.jobs) > JOBS_KEEP and (done := self.finished()):
+            self.jobs.pop(done[0])
+        self.queue.put_nowait((job, func, context))
+        self.start()
+        self.notify()
+        return job
+
+    def finished(self):
+        return [job_id for job_id, job in self.jobs.items() if job["status"] not in ("queued", "running")]
+
+    def start(self):
+        self.workers = [task for task in self.workers if not task.done()]
+        while len(self.workers) < self.concurrency:
+            self.workers.append(self.entry.entry.async_create_background_task(
+                self.hass, self._worker(), f"{DOMAIN}_{self.name}_worker_{self.entry.id}",
+            ))
+
+    async def _worker(self):
+        latency = self.entry.get_latency(self.name)
+        while True:
+            job, func, context = await self.queue.get()
+            job["status"] = "running"
+            job["started"] = time.time()
+            latency.add("queue", (job["started"] - job["created"]) * 1000)
+            self.running += 1
+            self.notify()
+            try:
+                job["result"] = await func()
+                job["status"] = "done"
+            except Exception as exc:
+                LOGGER.warning("%s job %s failed: %s", self.name, job["job_id"], exc)
+                job["error"] = str(exc)
+                job["status"] = "failed"
+            finally:
+                self.running -= 1
+                self.queue.task_done()
+            job["finished"] = time.time()
+            latency.add("total", (job["finished"] - job["created"]) * 1000)
+            self.counts[job["status"]] += 1
+            self.hass.bus.async_fire(self.event, job, context=context)
+            self.notify()
+
+    def notify(self):
+        async_dispatcher_send(self.hass, SIGNAL_JOBS_UPDATED.format(self.entry.id))
+
+    def last(self, **match):
+        """Most recently finished job with the matching info."""
+        jobs = [
+            job for job in self.jobs.values()
+            if "finished" in job and all(job.get(k) == v for k, v in match.items())
+        ]
+        return max(jobs, key=lambda job: job["finished"], default=None)
+
+    @property
+    def stats(self):
+        queued = [job for job in self.jobs.values() if job["status"] == "queued"]
+        return {
+            "queued": self.queue.qsize(),
+            "running": self.running,
+            "concurrency": self.concurrency,
+            "max_size": self.queue.maxsize,
+            "oldest_age": round(time.time() - queued[0]["created"], 1) if queued else 0,
+            **self.counts,
+        }
@@ -0,0 +1,106 @@
+import re
+import time
+
+from .const import *
+
+KEY_SEPARATOR = re.compile(r"[\s,;]+")
+QUARANTINE_RATE_LIMIT = 60
+QUARANTINE_AUTH = 600
+QUARANTINE_STATUSES = (401, 403, 429)
+
+
+def split_keys(value) -> list[str]:
+    """Several keys may be entered separated by commas or whitespace."""
+    if isinstance(value, (list, tuple)):
+        value = ",".join(map(str, value))
+    return list(dict.fromkeys(filter(None, KEY_SEPARATOR.split(str(value or "")))))
+
+
+class ApiKey:
+    def __init__(self, key: str, index: int):
+        self.key = key
+        self.index = index
+        self.in_flight = 0
+        self.requests = 0
+        self.tokens = 0
+        self.errors: dict[int, int] = {}
+        self.quarantined_until = 0.0
+
+    @property
+    def name(self):
+        return f"#{self.index} ...{self.key[-4:]}"
+
+    @property
+    def quarantined(self):
+        return self.quarantined_until > time.monotonic()
+
+    def as_dict(self):
+        return {
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "tokens": self.tokens,
+            "errors": self.errors,
+            "quarantined_for": round(max(0.0, self.quarantined_until - time.monotonic()), 1),
+        }
+
+
+class KeyPool:
+    """API keys of an entry, requests go to the least loaded key, rate limited or rejected keys sit out a while."""
+
+    def __init__(self, keys):
+        self.keys = [ApiKey(key, idx) for idx, key in enumerate(split_keys(keys))]
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def available(self):
+        return [key for key in self.keys if not key.quarantined]
+
+    def pick(self) -> ApiKey | None:
+        if not self.keys:
+            return None
+        if not (keys := self.available):
+            # all sitting out, the first one to come back is the best bet
+            return min(self.keys, key=lambda k: k.quarantined_until)
+        return min(keys, key=lambda k: (k.in_flight, k.requests))
+
+    def has_other(self, key: ApiKey | None):
+        """Whether a pool of several keys has another key to retry on."""
+        return len(self.keys) > 1 and any(other is not key for other in self.available)
+
+    def get(self, name) -> ApiKey | None:
+        for key in self.keys:
+            if key.name == name:
+                return key
+        return None
+
+    def acquire(self, key: ApiKey | None = None) -> ApiKey | None:
+        if key := key or self.pick():
+            key.in_flight += 1
+            key.requests += 1
+        return key
+
+    def release(self, key: ApiKey | None, status=None, retry_after=None):
+        if key is None:
+            return
+        key.in_flight = max(0, key.in_flight - 1)
+        if status not in QUARANTINE_STATUSES:
+            return
+        key.errors[status] = key.errors.get(status, 0) + 1
+        if len(self.keys) < 2:
+            # a single key is throttled by the scheduler instead
+            return
+        seconds = QUARANTINE_RATE_LIMIT if status == 429 else QUARANTINE_AUTH
+        if status == 429 and retry_after is not None:
+            seconds = retry_after
+        key.quarantined_until = max(key.quarantined_until, time.monotonic() + seconds)
+        LOGGER.info("API key %s got status %s, quarantined for %.0fs", key.name, status, seconds)
+
+    def record_tokens(self, name, tokens):
+        if key := self.get(name):
+            key.tokens += tokens or 0
+
+    @property
+    def stats(self):
+        return {key.name: key.as_dict() for key in self.keys}
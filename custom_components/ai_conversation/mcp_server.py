@@ -0,0 +1,180 @@
+import asyncio
+import json
+import anyio
+
+from aiohttp import web
+from aiohttp_sse import sse_response
+from aiohttp.web_exceptions import HTTPBadRequest
+from anyio.streams.memory import MemoryObjectReceiveStream, MemoryObjectSendStream
+from mcp import types
+from mcp.server import Server
+from collections.abc import Sequence
+
+from homeassistant.components import conversation
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.util import uuid
+
+from .const import *
+from .scheduler import request_priority, PRIORITY_MCP
+
+try:
+    from mcp.shared.message import SessionMessage  # ha>=2025.10,mcp>=1.14.1
+except (ImportError, ModuleNotFoundError):
+    SessionMessage = None
+
+_LOGGER = logging.getLogger(__name__)
+
+
+async def async_handle_sse(hass: HomeAssistant, request: web.Request, agent_id, session_id, session_uri):
+    sessions = hass.data[DOMAIN].setdefault("mcp_sessions", {})
+    read_stream: MemoryObjectReceiveStream[types.JSONRPCMessage | Exception]
+    read_stream_writer: MemoryObjectSendStream[types.JSONRPCMessage | Exception]
+    read_stream_writer, read_stream = anyio.create_memory_object_stream(0)
+
+    write_stream: MemoryObjectSendStream[types.JSONRPCMessage]
+    write_stream_reader: MemoryObjectReceiveStream[types.JSONRPCMessage]
+    write_stream, write_stream_reader = anyio.create_memory_object_stream(0)
+
+    sessions[session_id] = read_stream_writer
+
+    async with sse_response(request) as response:
+        server = await create_server(hass, agent_id)
+        options = await hass.async_add_executor_job(server.create_initialization_options)
+        _LOGGER.debug("Sending SSE endpoint: %s", session_uri)
+        await response.send(session_uri, event="endpoint")
+
+        async def sse_reader() -> None:
+            """Forward MCP server responses to the client."""
+            async for session_message in write_stream_reader:
+                if SessionMessage is not None and isinstance(session_message, SessionMessage):
+                    message = session_message.message
+                else:
+                    message = session_message
+                _LOGGER.debug("Sending SSE message: %s", message)
+                await response.send(
+                    message.model_dump_json(by_alias=True, exclude_none=True),
+                    event="message",
+                )
+
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(sse_reader)
+            await server.run(read_stream, write_stream, options)
+            return response
+
+
+async def async_handle_message(read_stream_writer, json_data):
+    try:
+        message = types.JSONRPCMessage.model_validate(json_data)
+    except ValueError as err:
+        _LOGGER.info("Failed to parse message: %s", err)
+        raise HTTPBadRequest(text="Could not parse message") from err
+
+    _LOGGER.debug("Received client message: %s", message)
+    if SessionMessage:
+        message = SessionMessage(message)
+    await read_stream_writer.send(message)
+
+
+async def create_server(hass: HomeAssistant, agent_id=None):
+    server = Server(DOMAIN)
+
+    @server.list_tools()  # type: ignore[no-untyped-call, misc]
+    async def list_tools() -> list[types.Tool]:
+        """List available time tools."""
+        return [
+            types.Tool(
+                name="ha_conversation",
+                description="Send conversation request to Home Assistant conversation agent",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "text": {
+                            "type": "string",
+                            "description": "The conversation text to send to Home Assistant",
+                        },
+                    },
+                    "required": ["text"],
+                },
+            )
+        ]
+
+    @server.call_tool()  # type: ignore[no-untyped-call, misc]
+    async def call_tool(name: str, arguments: dict) -> Sequence[types.TextContent]:
+        """Handle calling tools."""
+        if name != "ha_conversation":
+            raise ValueError(f"Unknown tool: {name}")
+
+        ctx = server.request_context
+        progress_token = ctx.meta.progressToken if ctx.meta else None
+        # not a ULID, so HA keeps it as the id of the new conversation
+        conversation_id = f"mcp_{uuid.random_uuid_hex()}"
+        updates: asyncio.Queue = asyncio.Queue()
+        unsub = None
+        sender = None
+
+        @callback
+        def on_progress(update: dict):
+            updates.put_nowait(update)
+
+        if progress_token is not None:
+            unsub = async_dispatcher_connect(hass, SIGNAL_TURN_PROGRESS.format(conversation_id), on_progress)
+            sender = hass.async_create_background_task(
+                send_progress(ctx.session, progress_token, updates), f"{DOMAIN}_mcp_progress",
+            )
+
+        token = request_priority.set(PRIORITY_MCP)
+        try:
+            result = await hass.services.async_call(
+                conversation.DOMAIN,
+                conversation.SERVICE_PROCESS,
+                {
+                    "agent_id": agent_id,
+                    "text": arguments["text"],
+                    "conversation_id": conversation_id,
+                },
+                blocking=True,
+                return_response=True,
+            )
+        finally:
+            request_priority.reset(token)
+            if unsub:
+                unsub()
+                updates.put_nowait(None)
+                await sender
+        return [
+            types.TextContent(type="text", text=compact_result(result)),
+        ]
+
+    return server
+
+
+async def send_progress(session, progress_token, updates: asyncio.Queue):
+    """Forward tool iterations of the turn as MCP progress notifications, until None."""
+    progress = 0
+    while (update := await updates.get()) is not None:
+        progress += 1
+        message = f"iteration {update['iteration'] + 1} {update['status']}"
+        if tools := update.get("tools"):
+            message += f", tools: {', '.join(tools)}"
+        if text := update.get("text"):
+            message += f": {text}"
+        try:
+            try:
+                await session.send_progress_notification(progress_token, progress, message=message)
+            except TypeError:
+                # older mcp versions have no message
+                await session.send_progress_notification(progress_token, progress)
+        except Exception as exc:
+            _LOGGER.debug("Failed to send progress: %s", exc)
+
+
+def compact_result(result: dict) -> str:
+    """Speech and targets of the conversation response, without the card, ids and empty fields."""
+    response = (result or {}).get("response") or {}
+    speech = response.get("speech") or {}
+    data = {
+        "speech": (speech.get("plain") or speech.get("ssml") or {}).get("speech"),
+        "response_type": response.get("response_type"),
+        **{key: value for key, value in (response.get("data") or {}).items() if value},
+    }
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
@@ -0,0 +1,175 @@
+import asyncio
+import json
+import math
+import time
+from aiohttp import TraceConfig
+from collections import deque, defaultdict
+
+from .const import *
+
+SAMPLES_MAXLEN = 500
+
+
+class LatencyStats:
+    """Rolling latency samples in milliseconds."""
+
+    def __init__(self, maxlen=SAMPLES_MAXLEN):
+        self.samples: dict[str, deque] = defaultdict(lambda: deque(maxlen=maxlen))
+
+    def add(self, name: str, value: float):
+        self.samples[name].append(value)
+
+    @staticmethod
+    def percentile(values: list, pct: float):
+        if not values:
+            return None
+        values = sorted(values)
+        idx = min(len(values) - 1, max(0, math.ceil(pct / 100 * len(values)) - 1))
+        return round(values[idx], 1)
+
+    def summary(self, name: str):
+        values = list(self.samples.get(name) or [])
+        return {
+            "count": len(values),
+            "p50": self.percentile(values, 50),
+            "p95": self.percentile(values, 95),
+            "p99": self.percentile(values, 99),
+        }
+
+    def as_dict(self):
+        return {
+            name: self.summary(name)
+            for name in sorted(self.samples)
+        }
+
+
+class RequestTiming:
+    """Timing of one provider call, passed to aiohttp as `trace_request_ctx`."""
+
+    def __init__(self, name: str, stats: LatencyStats | None = None, tracer: "TraceWriter | None" = None):
+        self.name = name
+        self.stats = stats
+        self.tracer = tracer
+        self.start = time.perf_counter()
+        self.phases: dict[str, float] = {}
+        self.sizes: dict[str, int] = defaultdict(int)
+        self.attrs: dict[str, Any] = {}
+        self._marks: dict[str, float] = {}
+
+    def elapsed(self, since=None):
+        return (time.perf_counter() - (since or self.start)) * 1000
+
+    def begin(self, phase: str):
+        self._marks[phase] = time.perf_counter()
+
+    def end(self, phase: str):
+        if (start := self._marks.pop(phase, None)) is not None:
+            self.phases[phase] = self.elapsed(start)
+
+    def mark(self, phase: str, once=True):
+        """Record time since start of the call."""
+        if once and phase in self.phases:
+            return
+        self.phases[phase] = self.elapsed()
+
+    def finish(self, **attrs):
+        self.phases["total"] = self.elapsed()
+        self.attrs.update(attrs)
+        if self.stats is not None:
+            for phase, value in self.phases.items():
+                self.stats.add(f"{self.name}.{phase}", value)
+        if self.tracer:
+            self.tracer.write({
+                "name": self.name,
+                "time": time.time(),
+                **{k: round(v, 2) for k, v in self.phases.items()},
+                **self.sizes,
+                **self.attrs,
+            })
+        return self
+
+
+class TraceWriter:
+    """Append timings to a JSON-lines file for offline analysis."""
+
+    def __init__(self, hass: HomeAssistant, path: str):
+        self.hass = hass
+        self.path = hass.config.path(path)
+        self.buffer: list[str] = []
+        self._pending = False
+        self._lock = asyncio.Lock()
+
+    def write(self, record: dict):
+        self.buffer.append(json.dumps(record, ensure_ascii=False, default=str))
+        if not self._pending:
+            self._pending = True
+            self.hass.async_add_executor_job(self._flush)
+
+    async def async_write(self, record: dict):
+        """Write and wait until it is on disk, errors reach the caller."""
+        self.buffer.append(json.dumps(record, ensure_ascii=False, default=str))
+        async with self._lock:
+            await self.hass.async_add_executor_job(self._flush)
+
+    def _flush(self):
+        self._pending = False
+        lines, self.buffer = self.buffer, []
+        if not lines:
+            return
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+
+def _timing(params_ctx) -> RequestTiming | None:
+    ctx = params_ctx.trace_request_ctx
+    return ctx if isinstance(ctx, RequestTiming) else None
+
+
+def create_trace_config():
+    """Capture dns/connect/ttfb phases and payload sizes of requests with a RequestTiming."""
+    trace = TraceConfig()
+
+    async def on_dns_start(session, ctx, params):
+        if timing := _timing(ctx):
+            timing.begin("dns")
+
+    async def on_dns_end(session, ctx, params):
+        if timing := _timing(ctx):
+            timing.end("dns")
+
+    async def on_connect_start(session, ctx, params):
+        if timing := _timing(ctx):
+            timing.begin("connect")
+
+    async def on_connect_end(session, ctx, params):
+        # aiohttp reports tcp and tls handshake as one phase
+        if timing := _timing(ctx):
+            timing.end("connect")
+
+    async def on_connection_reused(session, ctx, params):
+        if timing := _timing(ctx):
+            timing.attrs["reused"] = True
+
+    async def on_chunk_sent(session, ctx, params):
+        if timing := _timing(ctx):
+            timing.sizes["request_bytes"] += len(params.chunk)
+
+    async def on_request_end(session, ctx, params):
+        if timing := _timing(ctx):
+            timing.mark("ttfb")
+            timing.attrs["status"] = params.response.status
+
+    async def on_chunk_received(session, ctx, params):
+        if timing := _timing(ctx):
+            timing.mark("first_chunk")
+            timing.sizes["response_bytes"] += len(params.chunk)
+
+    trace.on_dns_resolvehost_start.append(on_dns_start)
+    trace.on_dns_resolvehost_end.append(on_dns_end)
+    trace.on_connection_create_start.append(on_connect_start)
+    trace.on_connection_create_end.append(on_connect_end)
+    trace.on_connection_reuseconn.append(on_connection_reused)
+    trace.on_request_chunk_sent.append(on_chunk_sent)
+    trace.on_request_end.append(on_request_end)
+    trace.on_response_chunk_received.append(on_chunk_received)
+    return trace
@@ -0,0 +1,147 @@
+import asyncio
+import heapq
+import itertools
+import time
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+
+from .const import *
+from .metrics import LatencyStats
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_MCP = 1
+PRIORITY_BATCH = 2
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_MCP: "mcp",
+    PRIORITY_BATCH: "batch",
+}
+MAX_RETRY_AFTER = 60
+
+request_priority: ContextVar[int] = ContextVar(f"{DOMAIN}_request_priority", default=PRIORITY_INTERACTIVE)
+
+
+def parse_retry_after(value) -> float | None:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount: float):
+        """Seconds until `amount` can be taken, requests larger than the bucket wait for a full one."""
+        self.refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        self.refill()
+        self.tokens -= amount
+
+
+class RequestScheduler:
+    """Admission control of provider requests with priority classes and rpm/tpm token buckets."""
+
+    def __init__(self, rpm=0, tpm=0):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.queue: list = []
+        self.paused_until = 0.0
+        self.waits = LatencyStats()
+        self.throttled = 0
+        self._seq = itertools.count()
+        self._timer: asyncio.TimerHandle | None = None
+
+    @property
+    def enabled(self):
+        return bool(self.requests or self.tokens)
+
+    def delay(self, tokens: float):
+        wait = max(0.0, self.paused_until - time.monotonic())
+        if self.requests:
+            wait = max(wait, self.requests.delay(1))
+        if self.tokens and tokens:
+            wait = max(wait, self.tokens.delay(tokens))
+        return wait
+
+    async def async_acquire(self, priority: int | None = None, tokens: float = 0):
+        """Wait for a slot, returns the waiting time in milliseconds."""
+        if priority is None:
+            priority = request_priority.get()
+        start = time.perf_counter()
+        if not self.queue and not self.delay(tokens):
+            self._take(tokens)
+        else:
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self.queue, (priority, next(self._seq), future, tokens))
+            self._dispatch()
+            try:
+                await future
+            finally:
+                if not future.done():
+                    future.cancel()
+                    self._dispatch()
+        waited = (time.perf_counter() - start) * 1000
+        self.waits.add(PRIORITY_NAMES.get(priority, str(priority)), waited)
+        return waited
+
+    def _take(self, tokens):
+        if self.requests:
+            self.requests.take(1)
+        if self.tokens and tokens:
+            self.tokens.take(tokens)
+
+    def _dispatch(self):
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        while self.queue:
+            _priority, _seq, future, tokens = self.queue[0]
+            if future.done():
+                heapq.heappop(self.queue)
+                continue
+            if wait := self.delay(tokens):
+                self._timer = asyncio.get_running_loop().call_later(wait, self._dispatch)
+                return
+            heapq.heappop(self.queue)
+            self._take(tokens)
+            future.set_result(None)
+
+    def consume_tokens(self, tokens: float):
+        """Charge tokens only known after the response, e.g. completion tokens."""
+        if self.tokens and tokens:
+            self.tokens.take(tokens)
+
+    def pause(self, seconds: float):
+        self.throttled += 1
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        LOGGER.info("Provider rate limited, pausing requests for %.1fs", seconds)
+
+    @property
+    def stats(self):
+        return {
+            "queue_depth": sum(1 for item in self.queue if not item[2].done()),
+            "paused_for": round(max(0.0, self.paused_until - time.monotonic()), 1),
+            "throttled": self.throttled,
+            "wait_ms": self.waits.as_dict(),
+        }
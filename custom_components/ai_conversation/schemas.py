@@ -56,22 +56,6 @@ class ChatMessage(Dict):
             return param
         return None
 
-    async def to_conversation_content_delta(self):
-        data = {
-            "role": self.role,
-            "content": self.content,
-        }
-        if self.tool_calls:
-            data["tool_calls"] = [
-                llm.ToolInput(
-                    id=tool_call["id"],
-                    tool_name=tool_call["function"]["name"],
-                    tool_args=json.loads(tool_call["function"]["arguments"]),
-                )
-                for tool_call in self.tool_calls
-            ]
-        yield data
-
 
 class ChatMessageContent(Dict):
     def __init__(self, text=None, image_url=None, video_url=None, file_url=None):
@@ -120,30 +104,129 @@ class ResponseJsonSchema(Dict):
                 return
             self._adjust_schema(schema["items"])
 
-class ChatCompletionsResult(Dict):
-    response = None
+class ResponseToolCall:
+    """Tool call of a response, arguments are decoded on first access."""
+    __slots__ = ("id", "type", "name", "arguments", "_args")
+
+    def __init__(self, data: dict):
+        func = data.get("function") or {}
+        self.id = data.get("id")
+        self.type = data.get("type", "function")
+        self.name = func.get("name")
+        self.arguments = func.get("arguments") or "{}"
+        self._args = None
+
+    @property
+    def args(self) -> dict:
+        if self._args is None:
+            args = self.arguments
+            self._args = json.loads(args) if isinstance(args, str) else dict(args)
+        return self._args
+
+    def __repr__(self):
+        return f"ResponseToolCall({self.id}, {self.name}, {self.arguments})"
+
+
+class ResponseMessage:
+    __slots__ = ("role", "content", "reasoning_content", "refusal", "_tool_calls", "_raw_tool_calls")
+
+    def __init__(self, data: dict):
+        self.role = data.get("role", "assistant")
+        self.content = data.get("content")
+        self.reasoning_content = data.get("reasoning_content")
+        self.refusal = data.get("refusal")
+        self._raw_tool_calls = data.get("tool_calls")
+        self._tool_calls = None
+
+    @property
+    def tool_calls(self) -> list[ResponseToolCall]:
+        if self._tool_calls is None:
+            self._tool_calls = [ResponseToolCall(call) for call in self._raw_tool_calls or ()]
+        return self._tool_calls
+
+    async def to_conversation_content_delta(self):
+        data = {
+            "role": self.role,
+            "content": self.content,
+        }
+        if self._raw_tool_calls:
+            data["tool_calls"] = [
+                llm.ToolInput(
+                    id=tool_call.id,
+                    tool_name=tool_call.name,
+                    tool_args=tool_call.args,
+                )
+                for tool_call in self.tool_calls
+            ]
+        yield data
+
+    def __repr__(self):
+        return f"ResponseMessage({self.role}, {self.content!r}, tool_calls={self._raw_tool_calls})"
+
+
+class ResponseChoice:
+    __slots__ = ("index", "finish_reason", "message")
+
+    def __init__(self, data: dict):
+        self.index = data.get("index", 0)
+        self.finish_reason = data.get("finish_reason")
+        message = data.get("message")
+        self.message = ResponseMessage(message) if isinstance(message, dict) else None
+
+
+class ResponseUsage:
+    __slots__ = ("prompt_tokens", "completion_tokens", "total_tokens", "cached_tokens", "raw")
+
+    def __init__(self, data: dict):
+        self.raw = data
+        self.prompt_tokens = data.get("prompt_tokens") or 0
+        self.completion_tokens = data.get("completion_tokens") or 0
+        self.total_tokens = data.get("total_tokens") or 0
+        details = data.get("prompt_tokens_details") or {}
+        self.cached_tokens = details.get("cached_tokens") or data.get("cached_tokens") or 0
+
+    def to_dict(self):
+        return self.raw
+
+    def __repr__(self):
+        return f"ResponseUsage({self.raw})"
+
+
+class ChatCompletionsResult:
+    """Chat completions response, parsed once on first access of each part."""
+    __slots__ = ("data", "response", "_choices", "_usage")
+
+    def __init__(self, data: dict | None = None):
+        self.data = data if isinstance(data, dict) else {}
+        self.response = None
+        self._choices = None
+        self._usage = None
 
     def to_dict(self):
-        data = self.copy()
-        data.pop("response", None)
-        return data
+        return self.data
+
+    @property
+    def error(self):
+        return self.data.get("error")
 
     @property
-    def choices(self):
-        choices = self.get("choices", [])
-        for choice in choices:
-            message = choice.get("message")
-            if not message:
-                 continue
-            elif "content" in message:
-                choice["message"] = ChatMessage(**message)
-            else:
-                LOGGER.info("Unknown message: %s", message)
-        return choices
+    def usage(self) -> ResponseUsage | None:
+        if self._usage is None and isinstance(usage := self.data.get("usage"), dict):
+            self._usage = ResponseUsage(usage)
+        return self._usage
 
     @property
-    def message(self):
+    def choices(self) -> list[ResponseChoice]:
+        if self._choices is None:
+            self._choices = [ResponseChoice(choice) for choice in self.data.get("choices") or ()]
+        return self._choices
+
+    @property
+    def message(self) -> ResponseMessage | None:
         for choice in self.choices:
-            if "message" in choice:
-                return choice["message"]
+            if choice.message is not None:
+                return choice.message
         return None
+
+    def __repr__(self):
+        return f"ChatCompletionsResult({self.data})"
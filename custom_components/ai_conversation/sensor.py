@@ -0,0 +1,177 @@
+from datetime import timedelta
+from homeassistant.components.sensor import (
+    DOMAIN as ENTITY_DOMAIN,
+    SensorEntity as BaseEntity,
+    SensorStateClass,
+)
+from homeassistant.const import EntityCategory, UnitOfTime
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.entity import async_generate_entity_id
+from homeassistant.helpers.event import async_track_time_change
+
+from . import HassEntry
+from .const import *
+from .usage import PERIODS, COUNTERS, SIGNAL_USAGE_UPDATED
+from .jobs import SIGNAL_JOBS_UPDATED
+
+SCAN_INTERVAL = timedelta(seconds=30)
+LATENCY_METRICS = {
+    "conversation": "chat.total",
+    "tts": "tts.first_audio",
+    "stt": "stt.total",
+}
+# tts and stt subentries only get the request counters
+TOKEN_COUNTERS = ("prompt_tokens", "completion_tokens", "cached_tokens", "cost")
+
+
+async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry, async_add_entities):
+    for subentry_id, subentry in config_entry.subentries.items():
+        entry = await HassEntry.async_init(hass, config_entry)
+        entities = [
+            UsageSensorEntity(entry, subentry, counter, period)
+            for period in PERIODS
+            for counter in COUNTERS
+            if subentry.subentry_type == "conversation" or counter not in TOKEN_COUNTERS
+        ] + [
+            LatencySensorEntity(entry, subentry),
+        ]
+        if subentry.subentry_type == "conversation":
+            entities.append(ExplainJobsSensorEntity(entry, subentry))
+        async_add_entities(entities, config_subentry_id=subentry_id)
+
+
+class SubentrySensorEntity(BaseEntity):
+    """Sensor of a subentry reading from HassEntry, not one of the model entities in `entry.entities`."""
+    _object_id = None
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+
+    def __init__(self, entry: HassEntry, subentry: ConfigSubentry):
+        self.hass = entry.hass
+        self.entry = entry
+        self.subentry = subentry
+        self._attr_device_info = entry.get_device_info(subentry)
+        self.on_init()
+        self.entity_id = async_generate_entity_id(
+            f"{ENTITY_DOMAIN}.{self._object_id}",
+            name=subentry.data.get(CONF_MODEL, ""),
+            hass=self.hass,
+        )
+
+    def on_init(self):
+        pass
+
+
+class UsageSensorEntity(SubentrySensorEntity):
+    _attr_should_poll = False
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+
+    def __init__(self, entry: HassEntry, subentry: ConfigSubentry, counter: str, period: str):
+        self.counter = counter
+        self.period = period
+        super().__init__(entry, subentry)
+
+    def on_init(self):
+        self._attr_name = f"{self.subentry.title} {self.counter} {self.period}".replace("_", " ")
+        self._attr_unique_id = f"{self.subentry.subentry_id}-{self.counter}-{self.period}"
+        self._object_id = f"{slugify(self.subentry.subentry_type)}_{{}}_{self.counter}_{self.period}"
+        if self.counter.endswith("_tokens"):
+            self._attr_native_unit_of_measurement = "tokens"
+        if self.counter == "cost":
+            self._attr_entity_registry_enabled_default = bool(
+                self.subentry.data.get(CONF_PROMPT_COST) or self.subentry.data.get(CONF_COMPLETION_COST)
+            )
+        if self.counter == "cached_tokens":
+            self._attr_entity_registry_enabled_default = False
+
+    async def async_added_to_hass(self):
+        await super().async_added_to_hass()
+        self.async_on_remove(async_dispatcher_connect(
+            self.hass,
+            SIGNAL_USAGE_UPDATED.format(self.subentry.subentry_id),
+            self.async_write_ha_state,
+        ))
+        self.async_on_remove(async_track_time_change(
+            self.hass,
+            self._async_rollover,
+            hour=0, minute=0, second=0,
+        ))
+
+    @callback
+    def _async_rollover(self, _now=None):
+        self.async_write_ha_state()
+
+    @property
+    def native_value(self):
+        return self.entry.usage.get(self.subentry.subentry_id, self.period, self.counter)
+
+    @property
+    def extra_state_attributes(self):
+        return {
+            "period": self.entry.usage.get(self.subentry.subentry_id, self.period, "key") or None,
+        }
+
+
+class LatencySensorEntity(SubentrySensorEntity):
+    _attr_should_poll = True
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+
+    def on_init(self):
+        self.metric = LATENCY_METRICS.get(self.subentry.subentry_type, "total")
+        self._attr_name = f"{self.subentry.title} latency"
+        self._attr_unique_id = f"{self.subentry.subentry_id}-latency"
+        self._object_id = f"{slugify(self.subentry.subentry_type)}_{{}}_latency"
+
+    @property
+    def latency(self):
+        return self.entry.get_latency(self.subentry.subentry_id)
+
+    @property
+    def native_value(self):
+        return self.latency.summary(self.metric).get("p50")
+
+    @property
+    def extra_state_attributes(self):
+        return {
+            "metric": self.metric,
+            **self.latency.as_dict(),
+        }
+
+
+class ExplainJobsSensorEntity(SubentrySensorEntity):
+    """Queued explain_media jobs of the service, with the last result of this agent."""
+    _attr_entity_category = None
+    _attr_should_poll = False
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_entity_registry_enabled_default = False
+
+    def on_init(self):
+        self._attr_name = f"{self.subentry.title} explain media jobs"
+        self._attr_unique_id = f"{self.subentry.subentry_id}-explain-jobs"
+        self._object_id = f"{slugify(self.subentry.subentry_type)}_{{}}_explain_jobs"
+
+    async def async_added_to_hass(self):
+        await super().async_added_to_hass()
+        self.async_on_remove(async_dispatcher_connect(
+            self.hass,
+            SIGNAL_JOBS_UPDATED.format(self.entry.id),
+            self.async_write_ha_state,
+        ))
+
+    @property
+    def native_value(self):
+        return self.entry.explain_jobs.queue.qsize()
+
+    @property
+    def extra_state_attributes(self):
+        job = self.entry.explain_jobs.last(subentry_id=self.subentry.subentry_id) or {}
+        result = job.get("result") or {}
+        return {
+            **self.entry.explain_jobs.stats,
+            "last_job_id": job.get("job_id"),
+            "last_status": job.get("status"),
+            "last_message": result.get("message"),
+            "last_tags": result.get("tags"),
+            "last_url": result.get("url"),
+            "last_error": job.get("error") or result.get("error"),
+        }
@@ -1,6 +1,7 @@
 from homeassistant.core import ServiceCall, SupportsResponse
 
 from .const import *
+from .scheduler import request_priority, PRIORITY_BATCH
 
 class ServiceManager:
     def __init__(self, hass: HomeAssistant):
@@ -9,6 +10,13 @@ class ServiceManager:
     def setup_explain_media(self):
         from . import HassEntry
         async def service(call: ServiceCall):
+            token = request_priority.set(PRIORITY_BATCH)
+            try:
+                return await explain_media(call)
+            finally:
+                request_priority.reset(token)
+
+        async def explain_media(call: ServiceCall):
             entity_ids = call.data.get(ATTR_ENTITY_ID)
             if not entity_ids:
                 return {"error": "No entity id"}
@@ -16,9 +24,106 @@ class ServiceManager:
                 for entity_id, entity in entry.entities.items():
                     if entity_id not in entity_ids:
                         continue
+                    if call.data.get("async"):
+                        return submit(entry, entity, call)
                     return await entity.async_explain_media(**call.data)
             return {"error": "Unknown"}
+
+        def submit(entry, entity, call: ServiceCall):
+            async def run():
+                token = request_priority.set(PRIORITY_BATCH)
+                try:
+                    return await entity.async_explain_media(**call.data)
+                finally:
+                    request_priority.reset(token)
+            job = entry.explain_jobs.submit(
+                run, context=call.context,
+                entity_id=entity.entity_id, subentry_id=entity.subentry.subentry_id,
+            )
+            return {"job_id": job["job_id"], "status": job["status"], "queued": entry.explain_jobs.queue.qsize()}
         self.hass.services.async_register(
             DOMAIN, "explain_media", service,
             supports_response=SupportsResponse.OPTIONAL,
         )
+
+    def setup_refresh_models(self):
+        from . import HassEntry
+        async def service(call: ServiceCall):
+            entry_id = call.data.get("config_entry_id")
+            result = {}
+            for entry in HassEntry.ALL.values():
+                if entry_id and entry.id != entry_id:
+                    continue
+                try:
+                    models = await entry.catalog.async_get(refresh=True)
+                except Exception as exc:
+                    result[entry.id] = {"error": str(exc)}
+                    continue
+                result[entry.id] = {"models": [m.get("id") for m in models if isinstance(m, dict)]}
+            return result
+        self.hass.services.async_register(
+            DOMAIN, "refresh_models", service,
+            supports_response=SupportsResponse.OPTIONAL,
+        )
+
+    def setup_transcribe(self):
+        from . import HassEntry
+        async def service(call: ServiceCall):
+            token = request_priority.set(PRIORITY_BATCH)
+            try:
+                return await transcribe(call)
+            finally:
+                request_priority.reset(token)
+
+        async def transcribe(call: ServiceCall):
+            entity_id = call.data.get(ATTR_ENTITY_ID)
+            media = call.data.get("media") or []
+            if isinstance(media, str):
+                media = [media]
+            for entry in HassEntry.ALL.values():
+                if not (entity := entry.entities.get(entity_id)) or not hasattr(entity, "async_transcribe_batch"):
+                    continue
+                return await entity.async_transcribe_batch(
+                    list(map(str, media)),
+                    concurrency=call.data.get("concurrency") or 2,
+                    output=call.data.get("output"),
+                )
+            return {"error": "Unknown stt entity"}
+        self.hass.services.async_register(
+            DOMAIN, "transcribe", service,
+            supports_response=SupportsResponse.OPTIONAL,
+        )
+
+    def setup_batches(self):
+        from . import HassEntry
+        async def create_batch(call: ServiceCall):
+            entity_id = call.data.get(ATTR_ENTITY_ID)
+            token = request_priority.set(PRIORITY_BATCH)
+            try:
+                for entry in HassEntry.ALL.values():
+                    if not (entity := entry.entities.get(entity_id)) or entity.domain != "conversation":
+                        continue
+                    return await entry.batches.async_create(
+                        entity,
+                        call.data.get("requests") or [],
+                        completion_window=call.data.get("completion_window") or "24h",
+                    )
+            finally:
+                request_priority.reset(token)
+            return {"error": "Unknown conversation entity"}
+
+        async def get_batch(call: ServiceCall):
+            job_id = call.data.get("job_id")
+            for entry in HassEntry.ALL.values():
+                if job := entry.batches.jobs.get(job_id):
+                    return job
+            return {"error": f"Unknown job {job_id}"}
+
+        self.hass.services.async_register(
+            DOMAIN, "create_batch", create_batch,
+            supports_response=SupportsResponse.OPTIONAL,
+        )
+        self.hass.services.async_register(
+            DOMAIN, "get_batch", get_batch,
+            supports_response=SupportsResponse.ONLY,
+        )
@@ -1,5 +1,9 @@
 import aiohttp
+import asyncio
 import json
+import mimetypes
+import os
+import time
 from homeassistant.components.stt import (
     DOMAIN as ENTITY_DOMAIN,
     SpeechToTextEntity as BaseEntity,
@@ -13,10 +17,20 @@ from homeassistant.components.stt import (
     SpeechResultState,
 )
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.components import media_source
+from homeassistant.components.media_player.browse_media import async_process_play_media_url
 from collections.abc import AsyncIterable
 
-from . import HassEntry, BasicEntity
+from . import HassEntry, BasicEntity, DeadlineExceeded
 from .const import *
+from .metrics import TraceWriter
+
+LOCAL_MEDIA_PREFIX = "media-source://media_source/"
+TRANSCRIBE_CONCURRENCY = 2
+# bulk uploads get the stt timeout plus time for the upload at this rate (bytes/s)
+UPLOAD_MIN_RATE = 50_000
+STREAM_READ_TIMEOUT = 300
 
 
 async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry, async_add_entities):
@@ -88,21 +102,48 @@ class SpeechToTextEntity(BasicEntity, BaseEntity):
             metadata.sample_rate,
             len(audio_data),
         )
-        extra = self.get_extra()
-        form = aiohttp.FormData({"model": self.model, **extra})
-        form.add_field(
-            "file", audio_data,
-            content_type=f"audio/{metadata.format.value}",
+        return await self.async_transcribe(
+            audio_data,
             filename=f"audio.{metadata.format.value}",
+            content_type=f"audio/{metadata.format.value}",
         )
-        resp = await self.entry.async_post("audio/transcriptions", data=form)
-        text = await resp.text()
+
+    async def async_transcribe(self, file, filename, content_type, size=None) -> SpeechResult:
+        """Send bytes, a file object or an async iterable of chunks to audio/transcriptions."""
+        extra = self.get_extra()
+        form = aiohttp.FormData({"model": self.model, **extra})
+        form.add_field("file", file, content_type=content_type, filename=filename)
+        timing = self.start_timing("stt")
+        timeout = self.get_timeout("stt")
+        if isinstance(file, bytes):
+            client_timeout = aiohttp.ClientTimeout(total=timeout)
+        elif size:
+            timeout += size / UPLOAD_MIN_RATE
+            client_timeout = aiohttp.ClientTimeout(total=timeout)
+        else:
+            # unknown length, only a stalled upload or response is given up
+            timeout = max(timeout, STREAM_READ_TIMEOUT)
+            client_timeout = aiohttp.ClientTimeout(total=None, sock_read=timeout)
+        try:
+            resp = await self.entry.async_post(
+                "audio/transcriptions", data=form, timing=timing, timeout=client_timeout,
+            )
+            text = await resp.text()
+        except TimeoutError as err:
+            timing.attrs["error"] = ERROR_TIMEOUT
+            self.record_usage(error=ERROR_TIMEOUT)
+            raise DeadlineExceeded(f"STT did not finish within {timeout:.0f}s") from err
+        finally:
+            timing.finish(audio_bytes=len(file) if isinstance(file, bytes) else size)
+        usage = None
         if not text or resp.status != 200:
+            self.record_usage()
             LOGGER.warning("Failed to process audio stream: %s", [text, resp.status, resp.headers])
             return SpeechResult(text, SpeechResultState.ERROR)
         if str(text).startswith("{"):
             try:
                 data = json.loads(text) or {}
+                usage = data.get("usage")
                 if txt := data.get("text"):
                     text = txt
                 else:
@@ -110,4 +151,86 @@ class SpeechToTextEntity(BasicEntity, BaseEntity):
                     return SpeechResult(text, SpeechResultState.ERROR)
             except Exception:
                 LOGGER.warning("Failed to parse json: %s", text, exc_info=True)
+            finally:
+                self.record_usage(usage)
+        else:
+            self.record_usage()
         return SpeechResult(text, SpeechResultState.SUCCESS)
+
+    def get_media_path(self, media: str):
+        if media.startswith(LOCAL_MEDIA_PREFIX):
+            source_dir_id, _, location = media[len(LOCAL_MEDIA_PREFIX):].partition("/")
+            if source_dir_id not in self.hass.config.media_dirs:
+                return None
+            media = os.path.join(self.hass.config.media_dirs[source_dir_id], location)
+        if os.path.isabs(media) and self.hass.config.is_allowed_path(media):
+            return media
+        return None
+
+    def get_output_path(self, output: str):
+        path = os.path.abspath(self.hass.config.path(output))
+        if not self.hass.config.is_allowed_path(path):
+            raise ServiceValidationError(f"Output path is not allowed: {output}")
+        return path
+
+    async def async_transcribe_media(self, media: str) -> dict:
+        """Transcribe one media-source id, url or allowed local file, streamed without buffering."""
+        start = time.perf_counter()
+        result = {"media": media}
+        try:
+            if path := self.get_media_path(media):
+                size = await self.hass.async_add_executor_job(os.path.getsize, path)
+                file = await self.hass.async_add_executor_job(open, path, "rb")
+                try:
+                    content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+                    res = await self.async_transcribe(file, os.path.basename(path), content_type, size)
+                finally:
+                    await self.hass.async_add_executor_job(file.close)
+            else:
+                url = media
+                if media_source.is_media_source_id(url):
+                    url = (await media_source.async_resolve_media(self.hass, url, None)).url
+                if not url.startswith("http"):
+                    url = async_process_play_media_url(self.hass, url)
+                async with self.session.get(url) as source:
+                    source.raise_for_status()
+                    filename = os.path.basename(source.url.path) or "audio"
+                    res = await self.async_transcribe(
+                        source.content.iter_chunked(65536), filename, source.content_type, source.content_length,
+                    )
+            result["text"] = res.text
+            if res.result != SpeechResultState.SUCCESS:
+                result["error"] = res.text or "error"
+        except Exception as exc:
+            LOGGER.info("Failed to transcribe %s: %s", media, exc)
+            result["error"] = str(exc) or type(exc).__name__
+        result["duration_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return result
+
+    async def async_transcribe_batch(self, media: list[str], concurrency=TRANSCRIBE_CONCURRENCY, output=None):
+        """Transcribe many files with a few workers, results are appended to `output` as they finish."""
+        writer = TraceWriter(self.hass, self.get_output_path(output)) if output else None
+        queue: asyncio.Queue[str] = asyncio.Queue()
+        for item in media:
+            queue.put_nowait(item)
+        results = []
+        summary = {"total": len(media), "success": 0, "failed": 0}
+        start = time.perf_counter()
+
+        async def worker():
+            while not queue.empty():
+                media = queue.get_nowait()
+                async with self.entry.transcribe_slots:
+                    result = await self.async_transcribe_media(media)
+                summary["failed" if "error" in result else "success"] += 1
+                if writer:
+                    await writer.async_write(result)
+                else:
+                    results.append(result)
+
+        await asyncio.gather(*(worker() for _ in range(max(1, min(int(concurrency), len(media) or 1)))))
+        summary["duration_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        if writer:
+            summary["output"] = writer.path
+            return summary
+        return {**summary, "results": results}
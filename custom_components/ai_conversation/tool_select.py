@@ -0,0 +1,75 @@
+import math
+import re
+from collections import Counter
+
+from .const import *
+
+WORD_PATTERN = re.compile(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])|\d+|[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]")
+NAME_WEIGHT = 3
+
+
+def tokenize(text) -> list[str]:
+    """Split camelCase/snake_case words, CJK text is indexed as unigrams and bigrams."""
+    words = [w.lower() for w in WORD_PATTERN.findall(str(text or ""))]
+    bigrams = [
+        a + b
+        for a, b in zip(words, words[1:])
+        if len(a) == 1 == len(b) and not a.isascii() and not b.isascii()
+    ]
+    return words + bigrams
+
+
+def tool_text(tool: dict):
+    func = tool.get("function") or {}
+    params = (func.get("parameters") or {}).get("properties") or {}
+    return func.get("name", ""), " ".join([
+        func.get("description") or "",
+        *params.keys(),
+        *(str(p.get("description") or "") for p in params.values() if isinstance(p, dict)),
+    ])
+
+
+class ToolIndex:
+    """Keyword index ranking tools against the user utterance."""
+
+    def __init__(self, tools: list[dict]):
+        self.tools = tools
+        self.names = []
+        self.docs: list[Counter] = []
+        df = Counter()
+        for tool in tools:
+            name, text = tool_text(tool)
+            self.names.append(name)
+            doc = Counter(tokenize(text))
+            for word in tokenize(name):
+                doc[word] += NAME_WEIGHT
+            self.docs.append(doc)
+            df.update(doc.keys())
+        total = len(tools) or 1
+        self.idf = {word: math.log(1 + total / cnt) for word, cnt in df.items()}
+
+    @property
+    def key(self):
+        return tuple(self.names)
+
+    def score(self, query: str):
+        words = set(tokenize(query))
+        return [
+            sum(self.idf.get(word, 0) * math.log(1 + doc.get(word, 0)) for word in words)
+            for doc in self.docs
+        ]
+
+    def select(self, query: str, top_k: int, pinned=None) -> list[dict]:
+        """Top-k tools plus the pinned ones, in their original order, all tools if none matches."""
+        pinned = set(pinned or [])
+        scores = self.score(query)
+        ranked = sorted(
+            (idx for idx in range(len(self.tools)) if scores[idx] > 0),
+            key=lambda idx: -scores[idx],
+        )
+        if not ranked:
+            # e.g. short or unsupported-language utterances, never leave the model without tools
+            return self.tools
+        keep = set(ranked[:top_k])
+        keep.update(idx for idx, name in enumerate(self.names) if name in pinned)
+        return [tool for idx, tool in enumerate(self.tools) if idx in keep]
@@ -1,6 +1,8 @@
+import asyncio
 import io
+import time
 import wave
-from aiohttp import web
+from aiohttp import web, ClientTimeout
 from base64 import urlsafe_b64decode
 from homeassistant.components.tts import (
     DOMAIN as ENTITY_DOMAIN,
@@ -10,19 +12,28 @@ from homeassistant.components.tts import (
     TTSAudioResponse,
     DATA_TTS_MANAGER,
     ATTR_VOICE,
+    ATTR_PREFERRED_SAMPLE_RATE,
+    ATTR_PREFERRED_SAMPLE_CHANNELS,
+    ATTR_PREFERRED_SAMPLE_BYTES,
 )
 from homeassistant.const import ATTR_MODEL
 from homeassistant.util import ulid
 from homeassistant.components.http import HomeAssistantView, KEY_HASS, KEY_AUTHENTICATED
 from collections.abc import AsyncGenerator
 
-from . import HassEntry, BasicEntity
+from . import HassEntry, BasicEntity, DeadlineExceeded
+from .cache import PhraseCache, hash_key
+from .audio import PcmConverter, wav_header, async_import_numpy, PCM_WIDTH
 from .const import *
 
 ATTR_GAIN = "gain"
 ATTR_SPEED = "speed"
 ATTR_FORMAT = "response_format"
 SUPPORTED_OPTIONS = [ATTR_VOICE, ATTR_MODEL, ATTR_SPEED, ATTR_GAIN, ATTR_FORMAT]
+PCM_OPTIONS = [ATTR_PREFERRED_SAMPLE_RATE, ATTR_PREFERRED_SAMPLE_CHANNELS, ATTR_PREFERRED_SAMPLE_BYTES]
+PHRASE_MAX_LENGTH = 100
+PREFETCH_TTL = 300
+PREFETCH_SIZE = 20
 
 
 async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry, async_add_entities):
@@ -46,6 +57,9 @@ class TextToSpeechEntity(BasicEntity, BaseEntity):
         self._attr_default_language = self.hass.config.language
         self._attr_supported_languages = [self.hass.config.language]
         self._attr_supported_options = [*SUPPORTED_OPTIONS]
+        if self.pcm_mode:
+            # converted locally instead of by the tts manager's ffmpeg
+            self._attr_supported_options.extend(PCM_OPTIONS)
         self._attr_extra_state_attributes = {}
 
     async def async_added_to_hass(self):
@@ -66,7 +80,23 @@ class TextToSpeechEntity(BasicEntity, BaseEntity):
             return extra.get(field)
         return extra
 
+    @property
+    def pcm_mode(self):
+        return bool(self.subentry.data.get(CONF_PCM))
+
+    async def async_get_pcm_converter(self, options: dict):
+        await async_import_numpy(self.hass)
+        return PcmConverter(
+            int(self.subentry.data.get(CONF_PCM_SAMPLE_RATE) or DEFAULT_PCM_SAMPLE_RATE),
+            out_rate=int(options.get(ATTR_PREFERRED_SAMPLE_RATE) or 0) or None,
+            out_channels=int(options.get(ATTR_PREFERRED_SAMPLE_CHANNELS) or 0) or None,
+            out_width=int(options.get(ATTR_PREFERRED_SAMPLE_BYTES) or PCM_WIDTH),
+            gain=options.get(ATTR_GAIN) or 0,
+        )
+
     def get_response_format(self, options: dict):
+        if self.pcm_mode:
+            return "wav"
         return (
             options.get(ATTR_FORMAT) or
             self.get_extra(ATTR_FORMAT) or
@@ -77,6 +107,15 @@ class TextToSpeechEntity(BasicEntity, BaseEntity):
     async def async_get_tts_audio(
         self, message: str, language: str, options: dict[str, Any]
     ) -> TtsAudioType:
+        if self.pcm_mode:
+            converter = await self.async_get_pcm_converter(options)
+            audio = b"".join([
+                converter.convert(chunk)
+                async for chunk in self._process_tts_audio_chunked(message, language, {**options, ATTR_FORMAT: "pcm"})
+            ])
+            if not audio:
+                raise HomeAssistantError("TTS error: empty pcm audio")
+            return ("wav", wav_header(converter.out_rate, converter.out_channels, converter.out_width, len(audio)) + audio)
         stream = await self._process_tts_audio(message, language, options)
         format = self.get_response_format(options) or "wav"
         return (format, stream)
@@ -96,9 +135,7 @@ class TextToSpeechEntity(BasicEntity, BaseEntity):
             raise HomeAssistantError(f"TTS error: {stream.decode()}")
         return stream
 
-    async def _process_tts_audio_chunked(
-        self, message: str, language: str, options: dict[str, Any]
-    ):
+    def get_request_params(self, message: str, options: dict[str, Any]):
         params = {
             **self.get_extra(),
             "input": message,
@@ -111,35 +148,127 @@ class TextToSpeechEntity(BasicEntity, BaseEntity):
             params[ATTR_SPEED] = speed
         if val := options.get(ATTR_FORMAT) or params.get(ATTR_FORMAT, ""):
             params["response_format"] = val
-        res = await self.entry.async_post("audio/speech", params)
-        LOGGER.debug("TTS request: %s", [params, str(res.request_info)])
-        res.raise_for_status()
-        if res.content_type in ["audio/mp3", "audio/mpeg"]:
-            options[ATTR_FORMAT] = "mp3"
-        if res.content_type == "audio/wav":
-            options[ATTR_FORMAT] = "wav"
-        if not res.content_type.startswith("audio/"):
-            LOGGER.warning("Unexpected content type: %s, %s", res.content_type, await res.text())
-            yield b""
-        else:
-            LOGGER.debug("TTS response format: %s", res.content_type)
-            async for chunk in res.content.iter_any():
-                yield chunk
+        return params
+
+    async def _process_tts_audio_chunked(
+        self, message: str, language: str, options: dict[str, Any]
+    ):
+        params = self.get_request_params(message, options)
+        timing = self.start_timing("tts")
+        timeout = self.get_timeout("tts")
+        res = None
+        try:
+            res = await self.entry.async_post(
+                "audio/speech", params, timing=timing, timeout=ClientTimeout(total=timeout),
+            )
+            self.record_usage()
+            LOGGER.debug("TTS request: %s", [params, str(res.request_info)])
+            res.raise_for_status()
+            if res.content_type in ["audio/mp3", "audio/mpeg"]:
+                options[ATTR_FORMAT] = "mp3"
+            if res.content_type == "audio/wav":
+                options[ATTR_FORMAT] = "wav"
+            raw_pcm = params.get("response_format") == "pcm" and res.content_type == "application/octet-stream"
+            if not res.content_type.startswith("audio/") and not raw_pcm:
+                LOGGER.warning("Unexpected content type: %s, %s", res.content_type, await res.text())
+                yield b""
+            else:
+                LOGGER.debug("TTS response format: %s", res.content_type)
+                async for chunk in res.content.iter_any():
+                    timing.mark("first_audio")
+                    timing.sizes["response_bytes"] += len(chunk)
+                    yield chunk
+        except TimeoutError as err:
+            timing.attrs["error"] = ERROR_TIMEOUT
+            self.record_usage(requests=0 if res else 1, error=ERROR_TIMEOUT)
+            raise DeadlineExceeded(f"TTS did not finish within {timeout}s") from err
+        finally:
+            if res is not None and not res.content.at_eof():
+                # cancelled or closed early, drop the connection instead of reusing it
+                res.close()
+            timing.finish(chars=len(message))
 
     async def _process_tts_stream(self, request: TTSAudioRequest) -> AsyncGenerator[bytes]:
         """Generate speech from an incoming message."""
         LOGGER.debug("Starting TTS Stream with options: %s", request.options)
-        if self.subentry.data.get("full_input"):
+        if self.pcm_mode:
+            async for chunk in self._process_pcm_stream(request):
+                yield chunk
+        elif self.subentry.data.get("full_input"):
             message = "".join([chunk async for chunk in request.message_gen])
             yield await self._process_tts_audio(message, request.language, request.options)
         else:
             header_sent = False
-            async for sentence in self.spilt_sentences(request.message_gen):
-                LOGGER.debug("Streaming tts sentence: %s", sentence)
-                audio_gen = self._process_tts_audio_chunked(sentence, request.language, request.options)
-                async for chunk in self.fix_wav_header(audio_gen, header_sent):
-                    header_sent = True
-                    yield chunk
+            # the requested format, before a response content type overrides it in the options
+            format = self.get_response_format(request.options)
+            timing = self.start_timing("tts_stream")
+            deadline = StreamDeadline(self.get_timeout("tts"))
+            sentences = 0
+            try:
+                async for sentence in self.spilt_sentences(request.message_gen):
+                    LOGGER.debug("Streaming tts sentence: %s", sentence)
+                    sentences += 1
+                    audio_gen = self._process_sentence(sentence, request.language, {**request.options}, format)
+                    async for chunk in deadline.iter(self.fix_wav_header(audio_gen, header_sent)):
+                        header_sent = True
+                        timing.mark("first_audio")
+                        yield chunk
+            finally:
+                timing.finish(sentences=sentences)
+
+    def get_phrase_key(self, sentence: str, options: dict, format: str):
+        if not self.subentry.data.get(CONF_PHRASE_CACHE) or len(sentence) > PHRASE_MAX_LENGTH:
+            return None
+        params = self.get_request_params("", options)
+        params.pop("input", None)
+        # the cache is shared by all entries, so the provider is part of the key
+        return hash_key(
+            " ".join(sentence.split()).lower(),
+            self.entry.get_config(CONF_BASE),
+            self.subentry.subentry_id,
+            params,
+            format,
+            self.subentry.data.get(CONF_PCM_SAMPLE_RATE) if self.pcm_mode else None,
+        )
+
+    async def _process_sentence(self, sentence: str, language, options: dict, format: str):
+        """Audio of one sentence of a stream, frequent phrases are served from the phrase cache."""
+        if not (key := self.get_phrase_key(sentence, options, format)):
+            async for chunk in self._process_tts_audio_chunked(sentence, language, options):
+                yield chunk
+            return
+        cache = PhraseCache.get_instance(self.hass)
+        if (audio := await cache.async_get(key)) is not None:
+            yield audio
+            return
+        chunks = []
+        async for chunk in self._process_tts_audio_chunked(sentence, language, options):
+            chunks.append(chunk)
+            yield chunk
+        if (audio := b"".join(chunks)) and audio[0:1] != b"{":
+            await cache.async_set(key, audio)
+
+    async def _process_pcm_stream(self, request: TTSAudioRequest) -> AsyncGenerator[bytes]:
+        """Raw pcm of every sentence behind a single local header, no container parsing."""
+        if self.subentry.data.get("full_input"):
+            sentences = async_iter(["".join([chunk async for chunk in request.message_gen])])
+        else:
+            sentences = self.spilt_sentences(request.message_gen)
+        converter = await self.async_get_pcm_converter(request.options)
+        options = {**request.options, ATTR_FORMAT: "pcm"}
+        timing = self.start_timing("tts_stream")
+        deadline = StreamDeadline(self.get_timeout("tts"))
+        count = 0
+        try:
+            yield wav_header(converter.out_rate, converter.out_channels, converter.out_width)
+            async for sentence in sentences:
+                count += 1
+                async for chunk in deadline.iter(self._process_sentence(sentence, request.language, {**options}, "pcm")):
+                    if chunk := converter.convert(chunk):
+                        timing.mark("first_audio")
+                        yield chunk
+        finally:
+            timing.finish(sentences=count, pcm=True)
 
     async def fix_wav_header(self, stream, header_sent=None):
         async for chunk in stream:
@@ -177,6 +306,85 @@ class TextToSpeechEntity(BasicEntity, BaseEntity):
             yield msg
 
 
+async def async_iter(items):
+    for item in items:
+        yield item
+
+
+class StreamDeadline:
+    """Deadline of a whole streamed response, each sentence adds `timeout` seconds of synthesis time.
+
+    Only waiting for audio counts, not waiting for the next sentence of the agent or for the consumer.
+    """
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self.budget = 0.0
+        self.sentences = 0
+
+    async def iter(self, gen):
+        self.sentences += 1
+        self.budget += self.timeout
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                start = loop.time()
+                try:
+                    async with asyncio.timeout(max(0.0, self.budget)):
+                        chunk = await anext(gen)
+                except StopAsyncIteration:
+                    return
+                except TimeoutError as err:
+                    raise DeadlineExceeded(
+                        f"TTS stream did not finish within {self.timeout * self.sentences:.0f}s"
+                    ) from err
+                finally:
+                    self.budget -= loop.time() - start
+                yield chunk
+        finally:
+            await gen.aclose()
+
+
+def create_tts_stream(hass: HomeAssistant, entity_id, message, options: dict, language=None, use_cache=None):
+    stream = hass.data[DATA_TTS_MANAGER].async_create_result_stream(
+        engine=entity_id,
+        use_file_cache=use_cache,
+        language=language,
+        options=options,
+    )
+    # the tts manager starts synthesis right away
+    stream.async_set_message(message)
+    return stream
+
+
+def get_prefetched(hass: HomeAssistant, key=None):
+    prefetched = hass.data.setdefault(DOMAIN, {}).setdefault("tts_prefetched", {})
+    now = time.monotonic()
+    for k in [k for k, (expires, _) in prefetched.items() if expires < now]:
+        prefetched.pop(k)
+    if key is None:
+        return prefetched
+    item = prefetched.get(key)
+    return item[1] if item else None
+
+
+@callback
+def async_prefetch_tts(hass: HomeAssistant, entity_id, message, options: dict):
+    """Start synthesis of a tts proxy url before a media player asks for it."""
+    key = hash_key(entity_id, message, options)
+    prefetched = get_prefetched(hass)
+    if key in prefetched:
+        return
+    try:
+        stream = create_tts_stream(hass, entity_id, message, options)
+    except Exception as exc:
+        LOGGER.info("Failed to prefetch tts of %s: %s", entity_id, exc)
+        return
+    prefetched[key] = (time.monotonic() + PREFETCH_TTL, stream)
+    while len(prefetched) > PREFETCH_SIZE:
+        prefetched.pop(next(iter(prefetched)))
+
+
 class AiTtsProxyView(HomeAssistantView):
     requires_auth = False
     cors_allowed = True
@@ -214,17 +422,17 @@ class AiTtsProxyView(HomeAssistantView):
         use_cache = None if nocache is None else (not nocache)
         LOGGER.debug("TTS api options: %s, use_cache: %s", options, use_cache)
 
+        stream = None
+        if use_cache is not False and not request.query.get("language"):
+            # attach to the synthesis started by the intent
+            stream = get_prefetched(hass, hash_key(entity_id, message, options))
         try:
-            stream = hass.data[DATA_TTS_MANAGER].async_create_result_stream(
-                engine=entity_id,
-                use_file_cache=use_cache,
-                language=request.query.get("language"),
-                options=options,
+            stream = stream or create_tts_stream(
+                hass, entity_id, message, options, request.query.get("language"), use_cache,
             )
         except Exception as err:
             return self.json({"error": str(err)}, 400)
 
-        stream.async_set_message(message)
         response: web.StreamResponse | None = None
         try:
             async for data in stream.async_stream_result():
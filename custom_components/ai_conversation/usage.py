@@ -0,0 +1,74 @@
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.util import dt as dt_util
+
+from .const import *
+
+STORAGE_VERSION = 1
+SAVE_DELAY = 30
+PERIODS = ("daily", "monthly")
+COUNTERS = ("requests", "prompt_tokens", "completion_tokens", "cached_tokens", "cost", "errors", "timeouts")
+SIGNAL_USAGE_UPDATED = f"{DOMAIN}_usage_updated_{{}}"
+
+
+def get_period_key(period, now=None):
+    now = now or dt_util.now()
+    if period == "monthly":
+        return now.strftime("%Y-%m")
+    return now.strftime("%Y-%m-%d")
+
+
+class UsageTracker:
+    """Accumulate token usage of provider calls per subentry."""
+
+    def __init__(self, hass: HomeAssistant, entry_id: str):
+        self.hass = hass
+        self.store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.usage_{entry_id}")
+        self.data: dict[str, dict] = {}
+
+    async def async_load(self):
+        self.data = await self.store.async_load() or {}
+
+    def get(self, subentry_id, period, counter=None):
+        item = self.data.get(subentry_id, {}).get(period) or {}
+        if item.get("key") != get_period_key(period):
+            item = {}
+        if counter:
+            return item.get(counter, 0)
+        return item
+
+    @callback
+    def async_record(self, subentry: ConfigSubentry, usage: dict | None = None, requests=1, error=None):
+        usage = usage or {}
+        prompt = usage.get("prompt_tokens") or usage.get("input_tokens") or 0
+        completion = usage.get("completion_tokens") or usage.get("output_tokens") or 0
+        details = usage.get("prompt_tokens_details") or usage.get("input_tokens_details") or {}
+        cached = details.get("cached_tokens") or usage.get("cached_tokens") or 0
+        cost = (
+            prompt * float(subentry.data.get(CONF_PROMPT_COST) or 0) +
+            completion * float(subentry.data.get(CONF_COMPLETION_COST) or 0)
+        ) / 1000
+        values = {
+            "requests": requests,
+            "prompt_tokens": prompt,
+            "completion_tokens": completion,
+            "cached_tokens": cached,
+            "cost": cost,
+            "errors": 1 if error else 0,
+            "timeouts": 1 if error == ERROR_TIMEOUT else 0,
+        }
+        periods = self.data.setdefault(subentry.subentry_id, {})
+        now = dt_util.now()
+        for period in PERIODS:
+            key = get_period_key(period, now)
+            item = periods.get(period) or {}
+            if item.get("key") != key:
+                item = periods[period] = {"key": key}
+            for counter, value in values.items():
+                item[counter] = item.get(counter, 0) + value
+            item["cost"] = round(item["cost"], 6)
+        self.store.async_delay_save(lambda: self.data, SAVE_DELAY)
+        async_dispatcher_send(self.hass, SIGNAL_USAGE_UPDATED.format(subentry.subentry_id))
+
+    async def async_remove(self):
+        await self.store.async_remove()
@@ -0,0 +1,40 @@
+import pytest
+
+pytest.importorskip("homeassistant")
+
+from custom_components.ai_conversation.context import ContextWindow, TRUNCATED_TOOL_CHARS  # noqa: E402
+
+
+def tool_iteration(idx, size):
+    return [
+        {"role": "assistant", "content": None, "tool_calls": [{"id": f"call_{idx}", "function": {"name": "GetLiveContext"}}]},
+        {"role": "tool", "tool_call_id": f"call_{idx}", "content": "x" * size},
+    ]
+
+
+def test_fit_truncates_earlier_tool_results_of_the_current_turn():
+    messages = [
+        {"role": "system", "content": "You are a voice assistant."},
+        {"role": "user", "content": "what is on in the house"},
+        *tool_iteration(1, 4000),
+        *tool_iteration(2, 4000),
+    ]
+    window = ContextWindow(1500)
+    fitted = window.fit(messages)
+    assert len(fitted) == len(messages)
+    assert len(fitted[3]["content"]) < TRUNCATED_TOOL_CHARS + 20
+    # the latest result is still to be answered
+    assert fitted[5]["content"] == "x" * 4000
+
+
+def test_fit_drops_old_turns_first():
+    messages = [
+        {"role": "system", "content": "prompt"},
+        {"role": "user", "content": "a" * 2000},
+        {"role": "assistant", "content": "b" * 2000},
+        {"role": "user", "content": "turn on the light"},
+    ]
+    window = ContextWindow(100)
+    fitted = window.fit(messages)
+    assert [msg["role"] for msg in fitted] == ["system", "user"]
+    assert window.dropped == messages[1:3]
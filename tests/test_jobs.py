@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+from custom_components.ai_conversation import jobs  # noqa: E402
+from custom_components.ai_conversation.jobs import JobQueue  # noqa: E402
+
+EVENT = "ai_conversation_test_job_done"
+
+
+class FakeBus:
+    def __init__(self):
+        self.events = []
+
+    def async_fire(self, event, data, context=None):
+        self.events.append((event, dict(data)))
+
+
+class FakeLatency:
+    def add(self, *args):
+        pass
+
+
+class FakeConfigEntry:
+    def async_create_background_task(self, hass, coro, name):
+        return asyncio.get_running_loop().create_task(coro, name=name)
+
+
+class FakeHass:
+    def __init__(self):
+        self.bus = FakeBus()
+
+
+class FakeEntry:
+    id = "entry"
+
+    def __init__(self):
+        self.hass = FakeHass()
+        self.entry = FakeConfigEntry()
+
+    def get_latency(self, name):
+        return FakeLatency()
+
+
+@pytest.fixture(autouse=True)
+def no_dispatcher(monkeypatch):
+    monkeypatch.setattr(jobs, "async_dispatcher_send", lambda *args: None)
+
+
+def run_jobs(results):
+    async def main():
+        entry = FakeEntry()
+        queue = JobQueue(entry, "explain", EVENT, concurrency=2, max_size=10)
+
+        def make(value):
+            async def run():
+                await asyncio.sleep(0)
+                if isinstance(value, Exception):
+                    raise value
+                return value
+            return run
+
+        submitted = [queue.submit(make(value), item=idx) for idx, value in enumerate(results)]
+        await queue.queue.join()
+        for task in queue.workers:
+            task.cancel()
+        return submitted, entry.hass.bus.events
+
+    return asyncio.run(main())
+
+
+def test_done_event_carries_job_id_and_result():
+    submitted, events = run_jobs([{"message": "a"}, {"message": "b"}])
+    assert len(events) == 2
+    by_id = {data["job_id"]: data for event, data in events}
+    assert all(event == EVENT for event, _ in events)
+    for idx, job in enumerate(submitted):
+        data = by_id[job["job_id"]]
+        assert data["status"] == "done"
+        assert data["item"] == idx
+        assert data["result"] == {"message": "ab"[idx]}
+
+
+def test_failed_job_event():
+    submitted, events = run_jobs([ValueError("boom")])
+    (event, data), = events
+    assert data["job_id"] == submitted[0]["job_id"]
+    assert data["status"] == "failed"
+    assert data["error"] == "boom"
+    assert "result" not in data
@@ -0,0 +1,36 @@
+import pytest
+
+pytest.importorskip("homeassistant")
+
+from custom_components.ai_conversation.tool_select import ToolIndex  # noqa: E402
+
+
+def make_tool(name, description):
+    return {
+        "type": "function",
+        "function": {
+            "name": name,
+            "description": description,
+            "parameters": {"type": "object", "properties": {"name": {"type": "string"}}},
+        },
+    }
+
+
+TOOLS = [
+    make_tool("HassTurnOn", "Turns on/opens a device or entity"),
+    make_tool("HassTurnOff", "Turns off/closes a device or entity"),
+    make_tool("GetLiveContext", "Provides real-time information about the states of devices"),
+    make_tool("HassMediaPause", "Pauses a media player"),
+]
+
+
+def test_select_top_k_and_pinned():
+    index = ToolIndex(TOOLS)
+    selected = index.select("pause the media player", 1, pinned=["GetLiveContext"])
+    assert [t["function"]["name"] for t in selected] == ["GetLiveContext", "HassMediaPause"]
+
+
+@pytest.mark.parametrize("query", ["", "ok", "xyzzy"])
+def test_select_without_match_keeps_all_tools(query):
+    index = ToolIndex(TOOLS)
+    assert index.select(query, 2, pinned=["GetLiveContext"]) == TOOLS